@@ -1,8 +1,6 @@
 import logging
 import os
 
-import requests
-
 from homewizard_climate_websocket.const import API_LOGIN, API_V1_PATH, API_DEVICES
 from homewizard_climate_websocket.model.climate_device import (
     HomeWizardClimateDevice,
@@ -34,6 +32,10 @@ class HomeWizardClimateApi:
         login_path = os.path.join(API_V1_PATH, API_LOGIN)
         _LOGGER.debug(f"Logging in to {login_path} with username {self._username}")
 
+        # Imported lazily, requests is slow to import and not needed by users
+        # who only work with the models
+        import requests
+
         resp = requests.get(login_path, auth=(self._username, self._password))
         _LOGGER.debug(f"Login ({self._username}) status code: {resp.status_code}")
         if (
@@ -51,6 +53,8 @@ class HomeWizardClimateApi:
             raise InvalidHomewizardAuth()
 
     def get_devices(self) -> list[HomeWizardClimateDevice]:
+        import requests
+
         resp = requests.get(
             os.path.join(API_V1_PATH, API_DEVICES),
             auth=(self._username, self._password),
@@ -0,0 +1,267 @@
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import Any, Optional
+
+from homewizard_climate_websocket.model.climate_device_state import (
+    HomeWizardClimateDeviceState,
+)
+from homewizard_climate_websocket.ws.hw_websocket import HomeWizardClimateWebSocket
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TOPIC_PREFIX = "homewizard_climate"
+
+# Command topic name -> (websocket method, whether it takes the payload as argument)
+COMMANDS: dict[str, tuple[str, bool]] = {
+    "turn_on": ("turn_on", False),
+    "turn_off": ("turn_off", False),
+    "set_fan_speed": ("set_fan_speed", True),
+    "set_target_temperature": ("set_target_temperature", True),
+    "turn_on_heater": ("turn_on_heater", False),
+    "turn_on_cooler": ("turn_on_cooler", False),
+    "turn_on_oscillation": ("turn_on_oscillation", False),
+    "turn_off_oscillation": ("turn_off_oscillation", False),
+}
+
+MessageCallback = Callable[[str, bytes], None]
+
+
+class PubSubClient(ABC):
+    """Minimal publish/subscribe interface the bridge talks to."""
+
+    @abstractmethod
+    def publish(self, topic: str, payload: bytes, retain: bool = False) -> None:
+        pass
+
+    @abstractmethod
+    def subscribe(self, topic_filter: str, callback: MessageCallback) -> None:
+        pass
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """MQTT style matching, `+` matches one level and `#` all remaining ones."""
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for i, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if i >= len(topic_levels):
+            return False
+        if level != "+" and level != topic_levels[i]:
+            return False
+
+    return len(filter_levels) == len(topic_levels)
+
+
+class LocalBroker(PubSubClient):
+    """In-process broker keeping retained messages, to run the bridge without
+    an MQTT server (e.g. in tests or when both ends live in one process)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._retained: dict[str, bytes] = {}
+        self._subscriptions: list[tuple[str, MessageCallback]] = []
+
+    @property
+    def retained(self) -> dict[str, bytes]:
+        with self._lock:
+            return dict(self._retained)
+
+    def publish(self, topic: str, payload: bytes, retain: bool = False) -> None:
+        with self._lock:
+            if retain:
+                self._retained[topic] = payload
+            callbacks = [
+                callback
+                for topic_filter, callback in self._subscriptions
+                if topic_matches(topic_filter, topic)
+            ]
+
+        for callback in callbacks:
+            callback(topic, payload)
+
+    def subscribe(self, topic_filter: str, callback: MessageCallback) -> None:
+        with self._lock:
+            self._subscriptions.append((topic_filter, callback))
+            retained = [
+                (topic, payload)
+                for topic, payload in self._retained.items()
+                if topic_matches(topic_filter, topic)
+            ]
+
+        for topic, payload in retained:
+            callback(topic, payload)
+
+
+class PahoMqttClient(PubSubClient):
+    """Adapter for a connected `paho.mqtt.client.Client` (paho-mqtt is an
+    optional dependency, install with the `mqtt` extra)."""
+
+    def __init__(self, client: Any, qos: int = 0):
+        self._client = client
+        self._qos = qos
+
+    def publish(self, topic: str, payload: bytes, retain: bool = False) -> None:
+        self._client.publish(topic, payload, qos=self._qos, retain=retain)
+
+    def subscribe(self, topic_filter: str, callback: MessageCallback) -> None:
+        self._client.message_callback_add(
+            topic_filter, lambda client, userdata, msg: callback(msg.topic, msg.payload)
+        )
+        self._client.subscribe(topic_filter, qos=self._qos)
+
+
+class HomeWizardClimatePubSubBridge:
+    """Publishes device states to a pub/sub bus and applies inbound commands.
+
+    Topics, with `<prefix>/<identifier>` as device root:
+    - `<root>/state/<field>`: retained JSON value of every state field. Only
+      fields that changed since the last publish are sent, and changes arriving
+      within `batch_interval` seconds are coalesced into one publish per field.
+    - `<root>/set/<field>`: JSON value to set a state field.
+    - `<root>/command/<name>`: one of `COMMANDS`, with a JSON argument if the
+      command takes one (e.g. `command/set_target_temperature` with `20`).
+    """
+
+    def __init__(
+        self,
+        client: PubSubClient,
+        topic_prefix: str = DEFAULT_TOPIC_PREFIX,
+        batch_interval: float = 0.1,
+    ):
+        self._client = client
+        self._topic_prefix = topic_prefix.rstrip("/")
+        self._batch_interval = batch_interval
+        self._lock = threading.Lock()
+        self._websockets: dict[str, HomeWizardClimateWebSocket] = {}
+        self._listeners: dict[str, Callable] = {}
+        self._published: dict[str, dict] = {}
+        self._pending: dict[str, dict] = {}
+        self._flush_event = threading.Event()
+        self._stop_requested = False
+        self._subscribed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def device_topic(self, identifier: str) -> str:
+        return f"{self._topic_prefix}/{identifier}"
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_requested = False
+        self._flush_event.clear()
+        if not self._subscribed:
+            # Clients can not unsubscribe, so the subscriptions outlive `stop`
+            self._subscribed = True
+            self._client.subscribe(f"{self._topic_prefix}/+/set/+", self._on_message)
+            self._client.subscribe(
+                f"{self._topic_prefix}/+/command/+", self._on_message
+            )
+        self._thread = threading.Thread(
+            target=self._run, name="hw-pubsub-bridge", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_requested = True
+        self._flush_event.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+    def add_websocket(self, ws: HomeWizardClimateWebSocket) -> None:
+        identifier = ws.device.identifier
+
+        def listener(state: HomeWizardClimateDeviceState, diff: str) -> None:
+            self._queue_state(identifier, state)
+
+        with self._lock:
+            self._websockets[identifier] = ws
+            self._listeners[identifier] = listener
+        ws.add_state_listener(listener)
+        self._queue_state(identifier, ws.last_state)
+
+    def remove_websocket(self, ws: HomeWizardClimateWebSocket) -> None:
+        identifier = ws.device.identifier
+        with self._lock:
+            self._websockets.pop(identifier, None)
+            self._pending.pop(identifier, None)
+            self._published.pop(identifier, None)
+            listener = self._listeners.pop(identifier, None)
+        if listener:
+            ws.remove_state_listener(listener)
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            for identifier, changes in pending.items():
+                self._published.get(identifier, {}).update(changes)
+
+        for identifier, changes in pending.items():
+            root = self.device_topic(identifier)
+            for field, value in changes.items():
+                self._client.publish(
+                    f"{root}/state/{field}", json.dumps(value).encode(), retain=True
+                )
+
+    def _queue_state(
+        self, identifier: str, state: HomeWizardClimateDeviceState
+    ) -> None:
+        with self._lock:
+            if identifier not in self._websockets:
+                return
+            published = self._published.setdefault(identifier, {})
+            pending = self._pending.setdefault(identifier, {})
+            for field, value in state.to_dict().items():
+                if field in published and published[field] == value:
+                    # Unchanged, or changed back before the batch was flushed
+                    pending.pop(field, None)
+                else:
+                    pending[field] = value
+
+            if not pending:
+                del self._pending[identifier]
+                return
+
+        self._flush_event.set()
+
+    def _run(self) -> None:
+        while not self._stop_requested:
+            self._flush_event.wait()
+            if self._stop_requested:
+                return
+            # Give bursts of updates the batch interval to coalesce
+            self._flush_event.clear()
+            time.sleep(self._batch_interval)
+            self.flush()
+
+    def _on_message(self, topic: str, payload: bytes) -> None:
+        if self._stop_requested:
+            return
+        parts = topic[len(self._topic_prefix) + 1 :].split("/")
+        if len(parts) != 3:
+            return
+        identifier, kind, name = parts
+        ws = self._websockets.get(identifier)
+        if ws is None:
+            _LOGGER.debug(f"Ignoring message for unknown device: {topic}")
+            return
+
+        try:
+            value = json.loads(payload) if payload else None
+            if kind == "set":
+                ws.patch_state({name: value})
+            elif kind == "command" and name in COMMANDS:
+                method, takes_value = COMMANDS[name]
+                if takes_value:
+                    getattr(ws, method)(value)
+                else:
+                    getattr(ws, method)()
+            else:
+                _LOGGER.error(f"Unknown command topic: {topic}")
+        except ValueError as e:
+            _LOGGER.error(f"Invalid message on {topic}: {e}")
@@ -2,3 +2,4 @@ API_V1_PATH = "https://api.homewizardeasyonline.com/v1"
 API_LOGIN = "auth/login"
 API_DEVICES = "auth/devices"
 API_WS_PATH = "wss://app-ws.homewizard.com/ws"
+WS_RECONNECT_DELAY_SECONDS = 1
@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from homewizard_climate_websocket.model.climate_device_state import (
+    check_state_changes,
+)
+from homewizard_climate_websocket.ws.hw_websocket import HomeWizardClimateWebSocket
+
+_LOGGER = logging.getLogger(__name__)
+
+DeviceSelector = Union[Callable[[HomeWizardClimateWebSocket], bool], Iterable[str]]
+
+
+@dataclass
+class HomeWizardClimateCommandResult:
+    identifier: str
+    acknowledged: bool
+    status: Optional[int]
+    error: Optional[str]
+    # Seconds spent waiting for the account's rate limit
+    queued_time: float
+    # Seconds between sending the command and receiving the server response
+    response_time: Optional[float]
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` acquisitions per second with bursts of up
+    to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        _check_rate_limit(rate, burst)
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._burst, self._tokens + (now - self._updated_at) * self._rate
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self._rate
+
+            time.sleep(wait)
+
+
+def _check_rate_limit(rate: float, burst: int) -> None:
+    if not rate > 0:
+        raise ValueError(f"Rate must be positive, got {rate}")
+    if burst < 1:
+        raise ValueError(f"Burst must be at least 1, got {burst}")
+
+
+class HomeWizardClimateBulkCommander:
+    """Applies the same state changes to many devices concurrently, over
+    their already open websocket connections.
+
+    Commands are rate limited per account (API username) and at most
+    `max_concurrency` of them are in flight at any time.
+    """
+
+    def __init__(
+        self,
+        websockets: Iterable[HomeWizardClimateWebSocket],
+        max_concurrency: int = 16,
+        rate_limit_per_second: float = 10.0,
+        rate_limit_burst: int = 10,
+        ack_timeout: float = 10.0,
+    ):
+        # Limiters are created per account on first use, fail early instead
+        _check_rate_limit(rate_limit_per_second, rate_limit_burst)
+        self._websockets = {ws.device.identifier: ws for ws in websockets}
+        self._max_concurrency = max_concurrency
+        self._rate_limit_per_second = rate_limit_per_second
+        self._rate_limit_burst = rate_limit_burst
+        self._ack_timeout = ack_timeout
+        self._rate_limiters: dict[str, RateLimiter] = {}
+        self._rate_limiters_lock = threading.Lock()
+
+    def add_websocket(self, ws: HomeWizardClimateWebSocket) -> None:
+        self._websockets[ws.device.identifier] = ws
+
+    def remove_websocket(self, ws: HomeWizardClimateWebSocket) -> None:
+        self._websockets.pop(ws.device.identifier, None)
+
+    def select(
+        self, selector: DeviceSelector = None
+    ) -> list[HomeWizardClimateWebSocket]:
+        """Websockets matching `selector`, which is either a predicate on the
+        websocket or a collection of device identifiers (e.g. the result of
+        `HomeWizardClimateFleetState.where`). `None` selects every device."""
+        if selector is None:
+            return list(self._websockets.values())
+        if callable(selector):
+            return [ws for ws in self._websockets.values() if selector(ws)]
+
+        return [self._websockets[x] for x in selector if x in self._websockets]
+
+    def apply(
+        self, changes: dict, selector: DeviceSelector = None
+    ) -> list[HomeWizardClimateCommandResult]:
+        """Sends `changes` (e.g. `{"target_temperature": 20}`) to the selected
+        devices and blocks until every one of them responded or timed out.
+        Raises `ValueError` for unknown state fields before sending anything."""
+        check_state_changes(changes)
+        targets = self.select(selector)
+        if not targets:
+            return []
+
+        _LOGGER.debug(f"Applying {changes} to {len(targets)} device(s)")
+        workers = min(self._max_concurrency, len(targets))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="hw-bulk"
+        ) as executor:
+            return list(
+                executor.map(lambda ws: self._apply_to_device(ws, changes), targets)
+            )
+
+    def _rate_limiter(self, ws: HomeWizardClimateWebSocket) -> RateLimiter:
+        account = ws.api.username
+        with self._rate_limiters_lock:
+            if account not in self._rate_limiters:
+                self._rate_limiters[account] = RateLimiter(
+                    self._rate_limit_per_second, self._rate_limit_burst
+                )
+            return self._rate_limiters[account]
+
+    def _apply_to_device(
+        self, ws: HomeWizardClimateWebSocket, changes: dict
+    ) -> HomeWizardClimateCommandResult:
+        identifier = ws.device.identifier
+        queued_at = time.monotonic()
+        self._rate_limiter(ws).acquire()
+        sent_at = time.monotonic()
+        queued_time = sent_at - queued_at
+
+        ack = ws.patch_state(changes)
+        try:
+            status = ack.result(timeout=self._ack_timeout)
+        except FutureTimeoutError:
+            ack.cancel()
+            return HomeWizardClimateCommandResult(
+                identifier, False, None, "timeout", queued_time, None
+            )
+        except Exception as e:
+            return HomeWizardClimateCommandResult(
+                identifier, False, None, str(e), queued_time, None
+            )
+
+        return HomeWizardClimateCommandResult(
+            identifier,
+            status == 200,
+            status,
+            None,
+            queued_time,
+            time.monotonic() - sent_at,
+        )
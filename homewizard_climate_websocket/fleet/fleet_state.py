@@ -0,0 +1,209 @@
+import logging
+import operator
+import threading
+from array import array
+from collections.abc import Callable
+from itertools import compress, repeat
+from typing import Optional
+
+from homewizard_climate_websocket.model.climate_device_state import (
+    HomeWizardClimateDeviceState,
+)
+from homewizard_climate_websocket.ws.hw_websocket import HomeWizardClimateWebSocket
+
+_LOGGER = logging.getLogger(__name__)
+
+# Numeric fields are stored as doubles so fractional temperatures survive,
+# booleans as signed chars (0/1).
+NUMERIC_COLUMNS = [
+    "current_temperature",
+    "target_temperature",
+    "fan_speed",
+    "timer",
+    "ext_current_temperature",
+    "ext_target_temperature",
+]
+BOOL_COLUMNS = [
+    "power_on",
+    "oscillate",
+    "vent_heat",
+    "silent",
+    "heater",
+]
+# Derived column, number of entries in `error`
+ERROR_COUNT_COLUMN = "error_count"
+
+_OPERATORS: dict[str, Callable] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+class HomeWizardClimateFleetState:
+    """Columnar copy of the numeric and boolean state fields of many devices.
+
+    Every column is an `array.array` with one row per device, so filters and
+    aggregates iterate over compact typed arrays instead of state objects.
+    `column` returns a copy supporting the buffer protocol, e.g. for
+    `numpy.frombuffer`.
+
+    Values of the wrong type (e.g. a string temperature) are skipped and the
+    device keeps its previous value for that column.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._identifiers: list[str] = []
+        self._groups: list[Optional[str]] = []
+        self._rows: dict[str, int] = {}
+        self._columns: dict[str, array] = {
+            **{name: array("d") for name in NUMERIC_COLUMNS},
+            **{name: array("b") for name in BOOL_COLUMNS},
+            ERROR_COUNT_COLUMN: array("l"),
+        }
+        self._listeners: dict[str, Callable] = {}
+
+    def __len__(self) -> int:
+        return len(self._identifiers)
+
+    def __contains__(self, identifier: str) -> bool:
+        return identifier in self._rows
+
+    @property
+    def identifiers(self) -> list[str]:
+        return list(self._identifiers)
+
+    def attach(
+        self, ws: HomeWizardClimateWebSocket, group: Optional[str] = None
+    ) -> None:
+        """Adds the websocket's device to the table and keeps its row updated
+        on every state change. Attaching an attached device again only updates
+        its group."""
+        identifier = ws.device.identifier
+        self.update(identifier, ws.last_state, group)
+        if identifier in self._listeners:
+            return
+
+        def listener(state: HomeWizardClimateDeviceState, diff: str) -> None:
+            self.update(identifier, state)
+
+        self._listeners[identifier] = listener
+        ws.add_state_listener(listener)
+
+    def detach(self, ws: HomeWizardClimateWebSocket) -> None:
+        identifier = ws.device.identifier
+        listener = self._listeners.pop(identifier, None)
+        if listener:
+            ws.remove_state_listener(listener)
+        self.remove(identifier)
+
+    def update(
+        self,
+        identifier: str,
+        state: HomeWizardClimateDeviceState,
+        group: Optional[str] = None,
+    ) -> None:
+        """Inserts or overwrites the row of a device. `group` (e.g. a building)
+        is kept from earlier calls when omitted."""
+        values = _row_values(identifier, state)
+        with self._lock:
+            row = self._rows.get(identifier)
+            if row is None:
+                row = len(self._identifiers)
+                self._rows[identifier] = row
+                self._identifiers.append(identifier)
+                self._groups.append(group)
+                for column in self._columns.values():
+                    column.append(0)
+            elif group is not None:
+                self._groups[row] = group
+
+            for name, value in values.items():
+                self._columns[name][row] = value
+
+    def remove(self, identifier: str) -> None:
+        with self._lock:
+            row = self._rows.pop(identifier, None)
+            if row is None:
+                return
+
+            # Move the last row into the hole to keep the columns dense
+            last = len(self._identifiers) - 1
+            if row != last:
+                moved = self._identifiers[last]
+                self._identifiers[row] = moved
+                self._groups[row] = self._groups[last]
+                self._rows[moved] = row
+                for column in self._columns.values():
+                    column[row] = column[last]
+
+            self._identifiers.pop()
+            self._groups.pop()
+            for column in self._columns.values():
+                column.pop()
+
+    def column(self, name: str) -> array:
+        """Copy of a column, rows are in `identifiers` order. A copy, because
+        an array exporting its buffer could no longer grow or shrink."""
+        with self._lock:
+            column = self._columns[name]
+            return array(column.typecode, column)
+
+    def where(self, name: str, op: str, value) -> list[str]:
+        """Identifiers of the devices for which `<column> <op> <value>` holds,
+        e.g. `where("current_temperature", ">", 24)`."""
+        compare = _OPERATORS[op]
+        with self._lock:
+            mask = map(compare, self._columns[name], repeat(value))
+            return list(compress(self._identifiers, mask))
+
+    def devices_with_errors(self) -> list[str]:
+        return self.where(ERROR_COUNT_COLUMN, ">", 0)
+
+    def count(self, name: str, op: str, value) -> int:
+        compare = _OPERATORS[op]
+        with self._lock:
+            return sum(map(compare, self._columns[name], repeat(value)))
+
+    def sum(self, name: str) -> float:
+        with self._lock:
+            return sum(self._columns[name])
+
+    def mean(self, name: str) -> Optional[float]:
+        with self._lock:
+            column = self._columns[name]
+            return sum(column) / len(column) if column else None
+
+    def mean_by_group(self, name: str) -> dict[Optional[str], float]:
+        """Mean of a column per group, e.g. the average fan speed per building."""
+        totals: dict[Optional[str], float] = {}
+        counts: dict[Optional[str], int] = {}
+        with self._lock:
+            for group, value in zip(self._groups, self._columns[name]):
+                totals[group] = totals.get(group, 0) + value
+                counts[group] = counts.get(group, 0) + 1
+
+        return {group: totals[group] / counts[group] for group in totals}
+
+
+def _row_values(identifier: str, state: HomeWizardClimateDeviceState) -> dict:
+    values = {}
+    for name in NUMERIC_COLUMNS:
+        value = getattr(state, name)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+        else:
+            _LOGGER.debug(f"Skipping non-numeric {name} of {identifier}: {value!r}")
+    for name in BOOL_COLUMNS:
+        value = getattr(state, name)
+        if isinstance(value, bool):
+            values[name] = 1 if value else 0
+        else:
+            _LOGGER.debug(f"Skipping non-boolean {name} of {identifier}: {value!r}")
+    if isinstance(state.error, (list, tuple)):
+        values[ERROR_COUNT_COLUMN] = len(state.error)
+    return values
@@ -1,24 +1,319 @@
+import argparse
+import json
 import logging
 import os
+import queue
+import signal
+import socketserver
+import stat
+import sys
+import threading
 import time
+from concurrent.futures import Future
+from typing import Optional, TextIO
 
 from homewizard_climate_websocket.api.api import HomeWizardClimateApi
+from homewizard_climate_websocket.model.climate_device import HomeWizardClimateDevice
+from homewizard_climate_websocket.model.climate_device_state import (
+    HomeWizardClimateDeviceState,
+)
+from homewizard_climate_websocket.server.state_server import (
+    HomeWizardClimateStateServer,
+    HomeWizardClimateStateStore,
+)
 from homewizard_climate_websocket.ws.hw_websocket import HomeWizardClimateWebSocket
 
-logging.basicConfig(level=logging.DEBUG)
+_LOGGER = logging.getLogger(__name__)
 
+DEFAULT_BUFFER_SIZE = 1000
+# How often an idle writer thread checks whether it should stop
+_WRITER_POLL_SECONDS = 0.1
+
+
+class EventWriter:
+    """Writes events as newline-delimited JSON from a dedicated thread.
+
+    At most `buffer_size` events are buffered; when the output can not keep up
+    the oldest events are dropped (and counted) instead of blocking the
+    websocket threads. The thread stops writing when the output fails (e.g. a
+    closed pipe), later events are then only counted as dropped.
+    """
+
+    def __init__(self, output: TextIO, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self._output = output
+        self._queue: queue.Queue = queue.Queue(maxsize=buffer_size)
+        self._dropped = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="hw-event-writer", daemon=True
+        )
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Writes what is buffered and stops the thread, waiting at most
+        `timeout` seconds. Events written after this are not guaranteed to be
+        written."""
+        self._stop_event.set()
+        self._thread.join(timeout)
+
+    def write(self, event: dict) -> None:
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self._dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _run(self) -> None:
+        while True:
+            try:
+                event = self._queue.get(timeout=_WRITER_POLL_SECONDS)
+            except queue.Empty:
+                # Only stop once everything buffered has been written
+                if self._stop_event.is_set():
+                    return
+                continue
+
+            lines = [json.dumps(event)]
+            # Drain what is already buffered to flush once per burst
+            while len(lines) < 100:
+                try:
+                    lines.append(json.dumps(self._queue.get_nowait()))
+                except queue.Empty:
+                    break
+
+            try:
+                self._output.write("\n".join(lines) + "\n")
+                self._output.flush()
+            except (OSError, ValueError) as e:
+                # ValueError is raised for writes to a closed file
+                self._dropped += len(lines)
+                _LOGGER.error(f"Could not write events, no longer writing: {e!r}")
+                return
+
+
+class Gateway:
+    """Monitors several devices at once, streams their state changes to an
+    `EventWriter` and applies commands of the form
+    `{"device": "<identifier>", "changes": {"target_temperature": 20}}`."""
+
+    def __init__(
+        self,
+        api: HomeWizardClimateApi,
+        devices: list[HomeWizardClimateDevice],
+        writer: EventWriter,
+    ):
+        self._writer = writer
+        self._websockets: dict[str, HomeWizardClimateWebSocket] = {}
+        for device in devices:
+            self._websockets[device.identifier] = HomeWizardClimateWebSocket(
+                api,
+                device,
+                on_initialized=self._on_initialized,
+                on_state_change=self._state_change_handler(device.identifier),
+            )
+
+    @property
+    def websockets(self) -> list[HomeWizardClimateWebSocket]:
+        return list(self._websockets.values())
+
+    def start(self) -> None:
+        for ws in self._websockets.values():
+            ws.connect_in_thread()
+
+    def stop(self) -> None:
+        for ws in self._websockets.values():
+            ws.disconnect()
+
+    def handle_command_line(self, line: str) -> None:
+        line = line.strip()
+        if not line:
+            return
+
+        try:
+            command = json.loads(line)
+            identifier = command["device"]
+            changes = command["changes"]
+            ws = self._websockets[identifier]
+        except (ValueError, KeyError, TypeError) as e:
+            self._writer.write(
+                {"event": "error", "time": time.time(), "error": f"{e!r}: {line}"}
+            )
+            return
+
+        try:
+            ack = ws.patch_state(changes)
+        except ValueError as e:
+            self._writer.write(
+                {
+                    "event": "error",
+                    "time": time.time(),
+                    "device": identifier,
+                    "error": str(e),
+                }
+            )
+            return
+
+        ack.add_done_callback(self._ack_handler(identifier, changes))
+
+    def _on_initialized(self, device: HomeWizardClimateDevice) -> None:
+        self._writer.write(
+            {"event": "initialized", "time": time.time(), "device": device.identifier}
+        )
+
+    def _state_change_handler(self, identifier: str):
+        def on_state_change(state: HomeWizardClimateDeviceState, diff: str) -> None:
+            self._writer.write(
+                {
+                    "event": "state",
+                    "time": time.time(),
+                    "device": identifier,
+                    "state": state.to_dict(),
+                }
+            )
+
+        return on_state_change
+
+    def _ack_handler(self, identifier: str, changes: dict):
+        def on_ack(ack: Future) -> None:
+            if ack.cancelled():
+                return
+            error = ack.exception()
+            self._writer.write(
+                {
+                    "event": "ack",
+                    "time": time.time(),
+                    "device": identifier,
+                    "changes": changes,
+                    "status": None if error else ack.result(),
+                    "error": str(error) if error else None,
+                }
+            )
+
+        return on_ack
+
+
+def _serve_stdin(gateway: Gateway) -> None:
+    for line in sys.stdin:
+        gateway.handle_command_line(line)
+
+
+def _command_socket_server(
+    gateway: Gateway, path: str
+) -> socketserver.ThreadingUnixStreamServer:
+    class CommandHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                gateway.handle_command_line(line.decode())
+
+    if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+        # Left behind by an earlier run, anything else is not ours to delete
+        os.unlink(path)
+    server = socketserver.ThreadingUnixStreamServer(path, CommandHandler)
+    server.daemon_threads = True
+    return server
+
+
+def _parse_args(args: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Stream the state of all Homewizard Climate devices as "
+        "newline-delimited JSON and accept commands on stdin or a unix socket. "
+        "Credentials are read from HW_CLIMATE_USERNAME and HW_CLIMATE_PASSWORD."
+    )
+    parser.add_argument(
+        "-o", "--output", help="File to append events to (default: stdout)"
+    )
+    parser.add_argument(
+        "--buffer-size",
+        type=int,
+        default=DEFAULT_BUFFER_SIZE,
+        help="Maximum number of buffered events before the oldest are dropped",
+    )
+    parser.add_argument(
+        "--command-socket", help="Path of a unix socket to accept commands on"
+    )
+    parser.add_argument(
+        "--no-stdin", action="store_true", help="Do not read commands from stdin"
+    )
+    parser.add_argument(
+        "--http-port",
+        type=int,
+        help="Serve device states over HTTP on this port of 127.0.0.1",
+    )
+    parser.add_argument(
+        "--http-socket", help="Path of a unix socket to serve device states on"
+    )
+    parser.add_argument(
+        "--log-level", default="WARNING", help="Log level, logs go to stderr"
+    )
+    return parser.parse_args(args)
+
+
+def main(args: Optional[list[str]] = None):
+    args = _parse_args(args)
+    logging.basicConfig(level=args.log_level.upper(), stream=sys.stderr)
 
-def main():
     username = os.environ["HW_CLIMATE_USERNAME"]
     password = os.environ["HW_CLIMATE_PASSWORD"]
     api = HomeWizardClimateApi(username, password)
     api.login()
     devices = api.get_devices()
-    ws = HomeWizardClimateWebSocket(api, devices[0])
-    ws.connect_in_thread()
-    time.sleep(5)
-    ws.disconnect()
-    time.sleep(5)
+    _LOGGER.info(f"Monitoring {len(devices)} device(s)")
+
+    output = open(args.output, "a") if args.output else sys.stdout
+    writer = EventWriter(output, args.buffer_size)
+    writer.start()
+    gateway = Gateway(api, devices, writer)
+    gateway.start()
+
+    state_server = None
+    if args.http_port is not None or args.http_socket:
+        store = HomeWizardClimateStateStore()
+        for ws in gateway.websockets:
+            store.add_websocket(ws)
+        state_server = HomeWizardClimateStateServer(
+            store, port=args.http_port, unix_socket_path=args.http_socket
+        )
+        state_server.start()
+
+    server = None
+    if args.command_socket:
+        server = _command_socket_server(gateway, args.command_socket)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    if not args.no_stdin:
+        # Running out of stdin does not stop the gateway, only signals do
+        threading.Thread(target=_serve_stdin, args=(gateway,), daemon=True).start()
+
+    try:
+        stop_event.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gateway.stop()
+        if state_server:
+            state_server.stop()
+        if server:
+            server.shutdown()
+            server.server_close()
+            os.unlink(args.command_socket)
+        writer.stop()
+        if writer.dropped:
+            _LOGGER.warning(f"Dropped {writer.dropped} event(s), output too slow")
+        if output is not sys.stdout:
+            output.close()
 
 
 if __name__ == "__main__":
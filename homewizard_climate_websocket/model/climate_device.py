@@ -1,9 +1,7 @@
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from enum import Enum
 from typing import Optional
 
-from dataclasses_json import dataclass_json
-
 
 class HomeWizardClimateDeviceType(Enum):
     """Only devices with these defined types will be picked
@@ -12,7 +10,6 @@ class HomeWizardClimateDeviceType(Enum):
     HEATERFAN = "heaterfan"
 
 
-@dataclass_json
 @dataclass
 class HomeWizardClimateDevice:
     name: Optional[str]
@@ -20,3 +17,16 @@ class HomeWizardClimateDevice:
     grants: Optional[list]
     type: HomeWizardClimateDeviceType
     endpoint: Optional[str]
+
+    @classmethod
+    def from_dict(cls, kvs: dict) -> "HomeWizardClimateDevice":
+        return cls(
+            name=kvs.get("name"),
+            identifier=kvs["identifier"],
+            grants=kvs.get("grants"),
+            type=HomeWizardClimateDeviceType(kvs["type"]),
+            endpoint=kvs.get("endpoint"),
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
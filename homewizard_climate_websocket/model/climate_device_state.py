@@ -1,11 +1,15 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 
-from dataclasses_json import dataclass_json
+# from_dict/to_dict are written by hand instead of using dataclasses_json, which
+# keeps importing the models cheap. The state only holds JSON native values.
 
 
-@dataclass_json
-@dataclass
+@dataclass(frozen=True)
 class HomeWizardClimateDeviceState:
+    """Immutable snapshot of a device state. Updates always produce a new
+    instance (see `dataclasses.replace`), so a reference can be shared between
+    threads without copying."""
+
     power_on: bool
     mode: str
     current_temperature: int
@@ -22,27 +26,92 @@ class HomeWizardClimateDeviceState:
     ext_current_temperature: int
     ext_target_temperature: int
 
+    @classmethod
+    def from_dict(cls, kvs: dict) -> "HomeWizardClimateDeviceState":
+        """Missing fields, and fields that are null or of the wrong type, get
+        their default value and unknown ones are ignored, so firmware adding or
+        dropping fields does not break parsing."""
+        if not isinstance(kvs, dict):
+            kvs = {}
+        values = {}
+        for name in _FIELD_NAMES:
+            value = kvs.get(name)
+            if not is_valid_state_value(name, value):
+                value = _DEFAULTS[name]
+            values[name] = list(value) if isinstance(value, list) else value
+        return cls(**values)
 
-def default_state():
-    return HomeWizardClimateDeviceState.from_dict(
-        {
-            "power_on": False,
-            "mode": "normal",
-            "current_temperature": 0,
-            "target_temperature": 0,
-            "fan_speed": 0,
-            "oscillate": False,
-            "timer": 0,
-            "ext_mode": [],
-            "heat_status": "idle",
-            "vent_heat": False,
-            "silent": False,
-            "heater": False,
-            "error": [],
-            "ext_current_temperature": 0,
-            "ext_target_temperature": 0,
+    def to_dict(self) -> dict:
+        # Lists are copied so callers can not mutate a shared state
+        return {
+            k: list(v) if isinstance(v, list) else v for k, v in self.__dict__.items()
         }
-    )
+
+
+_FIELD_NAMES = tuple(f.name for f in fields(HomeWizardClimateDeviceState))
+
+
+def _is_number(value) -> bool:
+    # bool is a subclass of int but never a valid temperature or speed
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_str_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+_VALIDATORS = {
+    bool: lambda value: isinstance(value, bool),
+    int: _is_number,
+    str: lambda value: isinstance(value, str),
+    list[str]: _is_str_list,
+}
+_FIELD_VALIDATORS = {
+    f.name: _VALIDATORS[f.type] for f in fields(HomeWizardClimateDeviceState)
+}
+
+
+def is_valid_state_value(name: str, value) -> bool:
+    """Whether `value` matches the declared type of the state field `name`."""
+    validator = _FIELD_VALIDATORS.get(name)
+    return validator is not None and validator(value)
+
+
+_DEFAULTS = {
+    "power_on": False,
+    "mode": "normal",
+    "current_temperature": 0,
+    "target_temperature": 0,
+    "fan_speed": 0,
+    "oscillate": False,
+    "timer": 0,
+    "ext_mode": [],
+    "heat_status": "idle",
+    "vent_heat": False,
+    "silent": False,
+    "heater": False,
+    "error": [],
+    "ext_current_temperature": 0,
+    "ext_target_temperature": 0,
+}
+
+_DEFAULT_STATE = HomeWizardClimateDeviceState.from_dict(_DEFAULTS)
+
+
+def state_field_names() -> tuple[str, ...]:
+    return _FIELD_NAMES
+
+
+def check_state_changes(changes: dict) -> None:
+    """Raises `ValueError` when `changes` holds fields the state does not have."""
+    unknown_fields = set(changes) - set(_FIELD_NAMES)
+    if unknown_fields:
+        raise ValueError(f"Unknown state fields: {sorted(unknown_fields)}")
+
+
+def default_state():
+    # States are immutable, so the same instance can be shared
+    return _DEFAULT_STATE
 
 
 def diff_states(
@@ -50,8 +119,9 @@ def diff_states(
     second_state: HomeWizardClimateDeviceState,
 ) -> str:
     result = ""
-    for k, v in first_state.to_dict().items():
-        second_value = second_state.to_dict().get(k)
+    for k in _FIELD_NAMES:
+        v = getattr(first_state, k)
+        second_value = getattr(second_state, k)
         if v != second_value:
             result += f"{k}: {v} -> {second_value}, "
 
@@ -0,0 +1,241 @@
+import heapq
+import itertools
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Optional
+
+from homewizard_climate_websocket.model.climate_device_state import (
+    HomeWizardClimateDeviceState,
+)
+from homewizard_climate_websocket.ws.hw_websocket import (
+    HomeWizardClimateWebSocket,
+    SocketStatus,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class HomeWizardClimateScheduleEntry:
+    """State patch applied every day at `at` (local time), e.g.
+    `HomeWizardClimateScheduleEntry(time(7), {"power_on": True,
+    "target_temperature": 20})`."""
+
+    at: time
+    changes: dict
+
+    def __post_init__(self):
+        if self.at.tzinfo is not None:
+            raise ValueError("Schedule entries use naive local times")
+
+
+class HomeWizardClimateScheduler:
+    """Fires daily per-device schedules through already open websockets.
+
+    Upcoming entries of every device live in a single heap ordered by fire
+    time, consumed by one worker thread. When an entry is due while its
+    device is not connected, or its patch is not acknowledged within
+    `ack_timeout` seconds, the latest missed entry is kept and applied as soon
+    as the device reports its state again after reconnecting.
+    """
+
+    def __init__(
+        self,
+        ack_timeout: float = 30.0,
+        clock: Callable[[], datetime] = datetime.now,
+    ):
+        self._ack_timeout = ack_timeout
+        self._clock = clock
+        self._queue: list = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._websockets: dict[str, HomeWizardClimateWebSocket] = {}
+        self._schedules: dict[str, list[HomeWizardClimateScheduleEntry]] = {}
+        # Replacing a schedule bumps the generation, stale heap items are skipped
+        self._generations: dict[str, int] = {}
+        self._missed: dict[str, HomeWizardClimateScheduleEntry] = {}
+        self._listeners: dict[str, Callable] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop_requested = False
+
+    def set_schedule(
+        self,
+        ws: HomeWizardClimateWebSocket,
+        entries: list[HomeWizardClimateScheduleEntry],
+    ) -> None:
+        identifier = ws.device.identifier
+        now = self._clock()
+        with self._condition:
+            self._websockets[identifier] = ws
+            self._schedules[identifier] = list(entries)
+            generation = self._generations.get(identifier, 0) + 1
+            self._generations[identifier] = generation
+            self._missed.pop(identifier, None)
+            for entry in entries:
+                self._push(identifier, generation, entry, _next_occurrence(entry, now))
+
+            if identifier not in self._listeners:
+                listener = self._catch_up_listener(identifier)
+                self._listeners[identifier] = listener
+                ws.add_state_listener(listener)
+
+            self._condition.notify()
+
+        _LOGGER.debug(f"Scheduled {len(entries)} entries for device {identifier}")
+
+    def clear_schedule(self, ws: HomeWizardClimateWebSocket) -> None:
+        identifier = ws.device.identifier
+        with self._condition:
+            self._generations[identifier] = self._generations.get(identifier, 0) + 1
+            self._schedules.pop(identifier, None)
+            self._websockets.pop(identifier, None)
+            self._missed.pop(identifier, None)
+            listener = self._listeners.pop(identifier, None)
+
+        if listener:
+            ws.remove_state_listener(listener)
+
+    def get_schedule(
+        self, ws: HomeWizardClimateWebSocket
+    ) -> list[HomeWizardClimateScheduleEntry]:
+        return list(self._schedules.get(ws.device.identifier, []))
+
+    def start(self) -> None:
+        with self._condition:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop_requested = False
+            self._thread = threading.Thread(
+                target=self._run, name="hw-scheduler", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stop_requested = True
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+
+    def _push(
+        self,
+        identifier: str,
+        generation: int,
+        entry: HomeWizardClimateScheduleEntry,
+        fire_at: datetime,
+    ) -> None:
+        heapq.heappush(
+            self._queue,
+            (fire_at, next(self._sequence), identifier, generation, entry),
+        )
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stop_requested:
+                    if self._queue:
+                        timeout = (self._queue[0][0] - self._clock()).total_seconds()
+                        if timeout <= 0:
+                            break
+                    else:
+                        timeout = None
+                    self._condition.wait(timeout)
+
+                if self._stop_requested:
+                    return
+
+                fire_at, _, identifier, generation, entry = heapq.heappop(self._queue)
+                if generation != self._generations.get(identifier):
+                    continue
+
+                self._push(
+                    identifier,
+                    generation,
+                    entry,
+                    _next_occurrence(entry, max(fire_at, self._clock())),
+                )
+                ws = self._websockets[identifier]
+
+            self._fire(ws, entry)
+
+    def _fire(
+        self, ws: HomeWizardClimateWebSocket, entry: HomeWizardClimateScheduleEntry
+    ) -> None:
+        identifier = ws.device.identifier
+        if ws.initialized != SocketStatus.INITIALIZED:
+            _LOGGER.debug(
+                f"Device {identifier} is not connected, keeping schedule entry "
+                f"{entry.at} until it reconnects"
+            )
+            with self._condition:
+                self._missed[identifier] = entry
+            return
+
+        _LOGGER.debug(f"Applying schedule entry {entry.at} to device {identifier}")
+        with self._condition:
+            # An older missed entry must not override this newer one later
+            self._missed.pop(identifier, None)
+        try:
+            ack = ws.patch_state(entry.changes)
+        except ValueError as e:
+            # Retrying an invalid patch after a reconnect would not help
+            _LOGGER.error(f"Could not apply schedule entry to {identifier}: {e}")
+            return
+
+        ack.add_done_callback(lambda f: self._on_fired(identifier, entry, f))
+        if not ack.done():
+            # A half-open connection may neither answer nor close, bound the wait
+            timer = threading.Timer(self._ack_timeout, ack.cancel)
+            timer.daemon = True
+            ack.add_done_callback(lambda f: timer.cancel())
+            timer.start()
+
+    def _on_fired(
+        self,
+        identifier: str,
+        entry: HomeWizardClimateScheduleEntry,
+        ack: Future,
+    ) -> None:
+        if ack.cancelled():
+            error = "not acknowledged in time"
+        elif ack.exception() is not None:
+            error = ack.exception()
+        else:
+            return
+
+        _LOGGER.debug(
+            f"Sending schedule entry {entry.at} to device {identifier} failed, "
+            f"keeping it until it reconnects: {error}"
+        )
+        with self._condition:
+            if identifier in self._websockets:
+                # Do not override a newer entry that was missed meanwhile
+                self._missed.setdefault(identifier, entry)
+
+    def _catch_up_listener(self, identifier: str):
+        def listener(state: HomeWizardClimateDeviceState, diff: str) -> None:
+            with self._condition:
+                ws = self._websockets.get(identifier)
+                if identifier not in self._missed or ws is None:
+                    return
+                if ws.initialized != SocketStatus.INITIALIZED:
+                    return
+                entry = self._missed.pop(identifier)
+
+            _LOGGER.debug(f"Catching up on missed schedule entry for {identifier}")
+            self._fire(ws, entry)
+
+        return listener
+
+
+def _next_occurrence(
+    entry: HomeWizardClimateScheduleEntry, after: datetime
+) -> datetime:
+    fire_at = datetime.combine(after.date(), entry.at)
+    if fire_at <= after:
+        fire_at += timedelta(days=1)
+    return fire_at
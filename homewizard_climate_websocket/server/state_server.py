@@ -0,0 +1,279 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import socketserver
+import stat
+import threading
+import time
+from collections.abc import Callable
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+from homewizard_climate_websocket.model.climate_device_state import (
+    HomeWizardClimateDeviceState,
+)
+from homewizard_climate_websocket.ws.hw_websocket import HomeWizardClimateWebSocket
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_LONG_POLL_SECONDS = 300
+SSE_KEEPALIVE_SECONDS = 15
+
+
+class HomeWizardClimateStateStore:
+    """Latest state of every device, versioned and pre-serialized once per
+    change so any number of readers can be served from it."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._websockets: dict[str, HomeWizardClimateWebSocket] = {}
+        self._listeners: dict[str, Callable] = {}
+        # identifier -> (version, serialized state, etag)
+        self._entries: dict[str, tuple[int, bytes, str]] = {}
+        self._closed = False
+
+    @property
+    def identifiers(self) -> list[str]:
+        with self._condition:
+            return list(self._entries)
+
+    def add_websocket(self, ws: HomeWizardClimateWebSocket) -> None:
+        identifier = ws.device.identifier
+
+        def listener(state: HomeWizardClimateDeviceState, diff: str) -> None:
+            with self._condition:
+                # A state change racing `remove_websocket` must not re-add it
+                if self._listeners.get(identifier) is not listener:
+                    return
+            self.update(identifier, state)
+
+        with self._condition:
+            if identifier in self._listeners:
+                return
+            self._websockets[identifier] = ws
+            self._listeners[identifier] = listener
+        ws.add_state_listener(listener)
+        self.update(identifier, ws.last_state)
+
+    def remove_websocket(self, ws: HomeWizardClimateWebSocket) -> None:
+        identifier = ws.device.identifier
+        with self._condition:
+            self._websockets.pop(identifier, None)
+            self._entries.pop(identifier, None)
+            listener = self._listeners.pop(identifier, None)
+            self._condition.notify_all()
+        if listener:
+            ws.remove_state_listener(listener)
+
+    def update(self, identifier: str, state: HomeWizardClimateDeviceState) -> None:
+        body = json.dumps(state.to_dict()).encode()
+        with self._condition:
+            version, current_body, _ = self._entries.get(identifier, (0, None, None))
+            if body == current_body:
+                # Repeated identical frames must not wake every reader
+                return
+            self._entries[identifier] = (version + 1, body, _etag(body))
+            self._condition.notify_all()
+
+    def get(self, identifier: str) -> Optional[tuple[int, bytes, str]]:
+        with self._condition:
+            return self._entries.get(identifier)
+
+    def wait_for_change(
+        self, identifier: str, known_version: int, timeout: float
+    ) -> Optional[tuple[int, bytes, str]]:
+        """Blocks until the device's version differs from `known_version` or
+        the timeout passes, and returns the then current entry."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not self._closed:
+                entry = self._entries.get(identifier)
+                if entry is None or entry[0] != known_version:
+                    return entry
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return entry
+                self._condition.wait(remaining)
+
+            return self._entries.get(identifier)
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+
+def _etag(body: bytes) -> str:
+    # Content based, so ETags stay valid across server restarts
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+class _StateRequestHandler(BaseHTTPRequestHandler):
+    """Routes:
+    - `GET /devices`: identifiers of the known devices.
+    - `GET /devices/<identifier>/state`: latest state with an ETag. With a
+      matching `If-None-Match` the response is `304`, unless `?wait=<seconds>`
+      is given, in which case the request is held until the state changes.
+    - `GET /devices/<identifier>/events`: server-sent events stream of states.
+    """
+
+    protocol_version = "HTTP/1.1"
+    store: HomeWizardClimateStateStore = None
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args) -> None:
+        _LOGGER.debug(f"{self.address_string()} - {format % args}")
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if parts == ["devices"]:
+            self._send_body(HTTPStatus.OK, json.dumps(self.store.identifiers).encode())
+        elif len(parts) == 3 and parts[0] == "devices" and parts[2] == "state":
+            self._get_state(parts[1], parse_qs(url.query))
+        elif len(parts) == 3 and parts[0] == "devices" and parts[2] == "events":
+            self._stream_events(parts[1])
+        else:
+            self._send_body(HTTPStatus.NOT_FOUND, b'{"error": "not found"}')
+
+    def _get_state(self, identifier: str, query: dict) -> None:
+        entry = self.store.get(identifier)
+        if entry is None:
+            self._send_body(HTTPStatus.NOT_FOUND, b'{"error": "unknown device"}')
+            return
+
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match == entry[2] and "wait" in query:
+            try:
+                wait = float(query["wait"][0])
+            except ValueError:
+                wait = math.nan
+            if not math.isfinite(wait) or wait <= 0:
+                self._send_body(HTTPStatus.BAD_REQUEST, b'{"error": "invalid wait"}')
+                return
+            wait = min(wait, MAX_LONG_POLL_SECONDS)
+            entry = self.store.wait_for_change(identifier, entry[0], wait)
+            if entry is None:
+                self._send_body(HTTPStatus.NOT_FOUND, b'{"error": "unknown device"}')
+                return
+
+        _, body, etag = entry
+        if if_none_match == etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self._send_body(HTTPStatus.OK, body, etag)
+
+    def _stream_events(self, identifier: str) -> None:
+        entry = self.store.get(identifier)
+        if entry is None:
+            self._send_body(HTTPStatus.NOT_FOUND, b'{"error": "unknown device"}')
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            version, body, _ = entry
+            self.wfile.write(b"id: %d\nevent: state\ndata: %s\n\n" % (version, body))
+            self.wfile.flush()
+            while not self.store.closed:
+                entry = self.store.wait_for_change(
+                    identifier, version, SSE_KEEPALIVE_SECONDS
+                )
+                if entry is None:
+                    return
+                if entry[0] == version:
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    version, body, _ = entry
+                    self.wfile.write(
+                        b"id: %d\nevent: state\ndata: %s\n\n" % (version, body)
+                    )
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_body(self, status: int, body: bytes, etag: str = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _ThreadingUnixHTTPServer(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    daemon_threads = True
+
+
+class HomeWizardClimateStateServer:
+    """Serves device states from one set of upstream websockets to any number
+    of local readers, over HTTP on a TCP port and/or a unix socket."""
+
+    def __init__(
+        self,
+        store: HomeWizardClimateStateStore,
+        host: str = "127.0.0.1",
+        port: Optional[int] = None,
+        unix_socket_path: Optional[str] = None,
+    ):
+        self._store = store
+        self._unix_socket_path = unix_socket_path
+        handler = type("StateRequestHandler", (_StateRequestHandler,), {"store": store})
+        self._servers: list[socketserver.BaseServer] = []
+        self._started = False
+        if port is not None:
+            server = ThreadingHTTPServer((host, port), handler)
+            server.daemon_threads = True
+            self._servers.append(server)
+        if unix_socket_path:
+            if os.path.exists(unix_socket_path) and stat.S_ISSOCK(
+                os.stat(unix_socket_path).st_mode
+            ):
+                # Left behind by an earlier run, anything else is not ours
+                os.unlink(unix_socket_path)
+            self._servers.append(_ThreadingUnixHTTPServer(unix_socket_path, handler))
+        if not self._servers:
+            raise ValueError("Either a port or a unix socket path is required")
+
+    @property
+    def server_address(self):
+        return self._servers[0].server_address
+
+    def start(self) -> None:
+        self._started = True
+        for server in self._servers:
+            threading.Thread(
+                target=server.serve_forever, name="hw-state-server", daemon=True
+            ).start()
+
+    def stop(self) -> None:
+        self._store.close()
+        for server in self._servers:
+            # shutdown() waits for serve_forever, which never ran without start
+            if self._started:
+                server.shutdown()
+            server.server_close()
+        if self._unix_socket_path and os.path.exists(self._unix_socket_path):
+            os.unlink(self._unix_socket_path)
@@ -1,28 +1,44 @@
-import inspect
+import itertools
 import json
 import logging
+import sys
 import threading
 from collections.abc import Callable
+from concurrent.futures import Future, InvalidStateError
 from dataclasses import replace
 from enum import Enum
-from ssl import SSLError
-
-import websocket
-from websocket._exceptions import WebSocketConnectionClosedException
+from typing import TYPE_CHECKING, Optional
 
 from homewizard_climate_websocket.api.api import HomeWizardClimateApi
-from homewizard_climate_websocket.const import API_WS_PATH
+from homewizard_climate_websocket.const import API_WS_PATH, WS_RECONNECT_DELAY_SECONDS
 from homewizard_climate_websocket.model.climate_device import (
     HomeWizardClimateDevice,
 )
 from homewizard_climate_websocket.model.climate_device_state import (
     HomeWizardClimateDeviceState,
+    check_state_changes,
     default_state,
     diff_states,
 )
+from homewizard_climate_websocket.ws.hw_websocket_frames import (
+    DeviceStateFrame,
+    JsonPatchFrame,
+    ResponseFrame,
+    decode_frame,
+)
 from homewizard_climate_websocket.ws.hw_websocket_payloads import (
     HomeWizardClimateWSPayloads,
 )
+from homewizard_climate_websocket.ws.hw_websocket_stats import (
+    HomeWizardClimateTrafficStats,
+    TrafficCounter,
+)
+from homewizard_climate_websocket.ws.hw_websocket_tracing import (
+    HomeWizardClimateCommandTracer,
+)
+
+if TYPE_CHECKING:
+    import websocket
 
 
 class SocketStatus(Enum):
@@ -33,12 +49,28 @@ class SocketStatus(Enum):
 
 
 class HomeWizardClimateWebSocket:
+    """Websocket client for a single device.
+
+    Concurrency model:
+    - A single connection thread (the one running `connect`) owns the socket loop
+      and is the only writer of the device state. Every update swaps
+      `last_state` for a new immutable snapshot, so readers on any thread get a
+      consistent state without locking.
+    - Socket status transitions are guarded by a lock, and only one connection
+      loop can run at a time; reconnects happen inside that loop instead of
+      spawning new threads.
+    - Commands may be sent from any thread, websocket-client serializes the
+      actual socket writes.
+    """
+
     def __init__(
         self,
         api: HomeWizardClimateApi,
         device: HomeWizardClimateDevice,
         on_initialized: Callable[[HomeWizardClimateDevice], None] = None,
         on_state_change: Callable[[HomeWizardClimateDeviceState, str], None] = None,
+        estimate_compression: bool = False,
+        tracer: Optional[HomeWizardClimateCommandTracer] = None,
     ):
         self._socket_status: SocketStatus = SocketStatus.PRE_INITIALIZATION
         self._last_state: HomeWizardClimateDeviceState = default_state()
@@ -47,9 +79,21 @@ class HomeWizardClimateWebSocket:
         self._payloads = HomeWizardClimateWSPayloads(api, device)
         self._on_initialized = on_initialized
         self._on_state_change = on_state_change
+        self._state_listeners: tuple = ()
+        self._listeners_lock = threading.Lock()
+        self._traffic = TrafficCounter(estimate_compression)
+        self._tracer = tracer
+        self._pending_acks: dict[str, Future] = {}
+        self._message_ids = itertools.count()
         self._disconnect_requested = False
+        self._status_lock = threading.Lock()
+        self._connection_loop_running = False
+        self._disconnect_event = threading.Event()
         self._LOGGER = logging.getLogger(f"{__name__}.{self._device.identifier}")
 
+        # websocket-client is imported on first use to keep the module import cheap
+        import websocket
+
         self._socket_app = websocket.WebSocketApp(
             API_WS_PATH,
             on_message=self._on_message,
@@ -62,6 +106,10 @@ class HomeWizardClimateWebSocket:
     def initialized(self) -> SocketStatus:
         return self._socket_status
 
+    @property
+    def api(self) -> HomeWizardClimateApi:
+        return self._api
+
     @property
     def device(self) -> HomeWizardClimateDevice:
         return self._device
@@ -70,116 +118,265 @@ class HomeWizardClimateWebSocket:
     def last_state(self) -> HomeWizardClimateDeviceState:
         return self._last_state
 
+    @property
+    def traffic_stats(self) -> HomeWizardClimateTrafficStats:
+        """Messages and bytes sent and received since creation (or the last
+        `reset_traffic_stats`). With `estimate_compression` it also holds what
+        permessage-deflate would have put on the wire."""
+        return self._traffic.stats
+
+    def reset_traffic_stats(self) -> None:
+        self._traffic.reset()
+
     def set_on_state_change(
         self, on_state_change: Callable[[HomeWizardClimateDeviceState, str], None]
     ) -> None:
         self._on_state_change = on_state_change
 
+    def add_state_listener(
+        self, listener: Callable[[HomeWizardClimateDeviceState, str], None]
+    ) -> None:
+        """Registers an extra state change callback next to `on_state_change`,
+        so several consumers can observe the same connection."""
+        with self._listeners_lock:
+            self._state_listeners = (*self._state_listeners, listener)
+
+    def remove_state_listener(
+        self, listener: Callable[[HomeWizardClimateDeviceState, str], None]
+    ) -> None:
+        with self._listeners_lock:
+            self._state_listeners = tuple(
+                x for x in self._state_listeners if x is not listener
+            )
+
     def is_device_online(self) -> bool:
         return self.initialized and self._last_state != default_state()
 
     def connect(self) -> None:
-        if self._socket_status not in [
-            SocketStatus.INITIALIZED,
-            SocketStatus.INITIALIZING,
-        ]:
-            self._socket_status = SocketStatus.INITIALIZING
-            self._LOGGER.info(f"Connecting to websocket ({API_WS_PATH})")
-            self._socket_app.run_forever()
-        else:
-            self._LOGGER.info(
-                f"Can not attempt socket connection because of current "
-                f"socket status: {self._socket_status}"
-            )
+        """Blocks while the connection is alive, reconnecting automatically
+        until `disconnect` is called."""
+        self._clear_disconnect_request()
+        self._connect()
 
     def connect_in_thread(self) -> None:
-        thread = threading.Thread(target=self.connect)
+        # Cleared in the calling thread, so a `disconnect` issued right after
+        # this call is not undone by the connection thread starting late
+        self._clear_disconnect_request()
+        self._start_connection_thread()
+
+    def _clear_disconnect_request(self) -> None:
+        with self._status_lock:
+            self._disconnect_requested = False
+            self._disconnect_event.clear()
+
+    def _start_connection_thread(self) -> None:
+        thread = threading.Thread(target=self._connect)
         thread.daemon = True
         thread.start()
 
+    def _connect(self) -> None:
+        with self._status_lock:
+            if self._connection_loop_running:
+                self._LOGGER.info(
+                    f"Can not attempt socket connection because of current "
+                    f"socket status: {self._socket_status}"
+                )
+                return
+
+            self._connection_loop_running = True
+            self._socket_status = SocketStatus.INITIALIZING
+
+        try:
+            self._connection_loop()
+        finally:
+            with self._status_lock:
+                self._connection_loop_running = False
+
+    def _connection_loop(self) -> None:
+        while True:
+            with self._status_lock:
+                if self._disconnect_requested:
+                    self._socket_status = SocketStatus.NOT_INITIALIZED
+                    self._LOGGER.debug(
+                        "Disconnect was requested before connecting, not connecting"
+                    )
+                    return
+                self._socket_status = SocketStatus.INITIALIZING
+
+            self._LOGGER.info(f"Connecting to websocket ({API_WS_PATH})")
+            self._socket_app.run_forever()
+            self._fail_pending_acks()
+
+            with self._status_lock:
+                self._socket_status = SocketStatus.NOT_INITIALIZED
+                if self._disconnect_requested:
+                    self._LOGGER.debug(
+                        "Disconnect was explicitly requested, not attempting to "
+                        "reconnect"
+                    )
+                    return
+
+            self._LOGGER.debug("Automatically reconnecting on unwanted closed socket")
+            self._disconnect_event.wait(WS_RECONNECT_DELAY_SECONDS)
+
     def disconnect(self) -> None:
-        self._disconnect_requested = True
+        with self._status_lock:
+            self._disconnect_requested = True
+        self._disconnect_event.set()
         self._socket_app.close()
 
-    def _send_message(self, payload: str) -> None:
-        calling_method = inspect.stack()[1].function
-        self._LOGGER.debug(
-            f"Sending message for command {calling_method}: "
-            f"{self._safe_payload_log(payload)}"
-        )
+    def _send_command(self, build: Callable[..., str], *args) -> bool:
+        trace = None
+        if self._tracer:
+            trace = self._tracer.command_built(self._device.identifier, build.__name__)
+        payload = build(*args)
+        sent = self._send_message(payload, build.__name__)
+        if trace and sent:
+            self._tracer.command_sent(trace, payload)
+        return sent
+
+    def _send_message(self, payload: str, command: str = None) -> bool:
+        from ssl import SSLError
+
+        from websocket import WebSocketConnectionClosedException
+
+        if self._LOGGER.isEnabledFor(logging.DEBUG):
+            calling_method = command or sys._getframe(1).f_code.co_name
+            self._LOGGER.debug(
+                f"Sending message for command {calling_method}: "
+                f"{self._safe_payload_log(payload)}"
+            )
         try:
             self._socket_app.send(payload)
+            self._traffic.record_out(payload)
+            return True
         except (WebSocketConnectionClosedException, SSLError):
             self._auto_reconnect_if_needed()
+            return False
 
     def turn_on(self) -> None:
-        self._send_message(self._payloads.turn_on())
+        self._send_command(self._payloads.turn_on)
 
     def turn_off(self) -> None:
-        self._send_message(self._payloads.turn_off())
+        self._send_command(self._payloads.turn_off)
 
     def set_fan_speed(self, speed: int) -> None:
-        self._send_message(self._payloads.set_fan_speed(speed))
+        self._send_command(self._payloads.set_fan_speed, speed)
 
     def set_target_temperature(self, temp: int) -> None:
-        self._send_message(self._payloads.set_target_temperature(temp))
+        self._send_command(self._payloads.set_target_temperature, temp)
 
     def turn_on_heater(self) -> None:
-        self._send_message(self._payloads.set_heater())
+        self._send_command(self._payloads.set_heater)
 
     def turn_on_cooler(self) -> None:
-        self._send_message(self._payloads.set_cooler())
+        self._send_command(self._payloads.set_cooler)
 
     def turn_on_oscillation(self) -> None:
-        self._send_message(self._payloads.turn_on_oscillate())
+        self._send_command(self._payloads.turn_on_oscillate)
 
     def turn_off_oscillation(self) -> None:
-        self._send_message(self._payloads.turn_off_oscillate())
+        self._send_command(self._payloads.turn_off_oscillate)
+
+    def patch_state(self, changes: dict) -> Future:
+        """Sends several state changes in one message, e.g.
+        `{"power_on": True, "target_temperature": 20}`. The returned future
+        resolves to the status code of the server's response, or fails with
+        `WebSocketConnectionClosedException` when the connection closes first."""
+        check_state_changes(changes)
+
+        message_id = f"patch_{next(self._message_ids)}"
+        ack: Future = Future()
+        self._pending_acks[message_id] = ack
+        # Callers may cancel the future when they stop waiting for the response
+        ack.add_done_callback(lambda _: self._pending_acks.pop(message_id, None))
+        if not self._send_command(self._payloads.patch_state, changes, message_id):
+            from websocket import WebSocketConnectionClosedException
+
+            ack.set_exception(
+                WebSocketConnectionClosedException("Could not send state patch")
+            )
+        return ack
+
+    def _fail_pending_acks(self) -> None:
+        from websocket import WebSocketConnectionClosedException
+
+        # Responses to commands sent over a closed connection never arrive
+        for ack in list(self._pending_acks.values()):
+            try:
+                ack.set_exception(
+                    WebSocketConnectionClosedException(
+                        "Connection closed before the state patch was acknowledged"
+                    )
+                )
+            except InvalidStateError:
+                pass
 
     def _hello(self):
         self._send_message(self._payloads.hello())
 
-    def _on_open(self, ws: websocket.WebSocket) -> None:
+    def _on_open(self, ws: "websocket.WebSocket") -> None:
         self._LOGGER.debug("Websocket opened")
+        with self._status_lock:
+            disconnect_requested = self._disconnect_requested
+        if disconnect_requested:
+            # `disconnect` ran before the socket existed, so its close() was a no-op
+            self._LOGGER.debug("Disconnect was requested while connecting, closing")
+            self._socket_app.close()
+            return
+        self._traffic.connection_opened()
         self._hello()
 
-    def _on_ping(self, ws: websocket.WebSocket) -> None:
+    def _on_ping(self, ws: "websocket.WebSocket") -> None:
         self._socket_app.sock.pong()
 
-    def _on_message(self, ws: websocket.WebSocket, message: str) -> None:
+    def _on_message(self, ws: "websocket.WebSocket", message: str) -> None:
         self._LOGGER.debug(f"Received message: {message}")
+        self._traffic.record_in(message)
 
-        message_dict: dict = json.loads(message)
-        message_device = message_dict.get("device")
-
-        if message_device and message_device != self._device.identifier:
+        frame = decode_frame(message)
+        if frame.device and frame.device != self._device.identifier:
             self._LOGGER.error(
                 f"Got a message for a different device. Expected: "
-                f'{self._device.identifier}, got: {message_dict.get("device")}'
+                f"{self._device.identifier}, got: {frame.device}"
             )
 
             return
 
-        message_type = message_dict.get("type", "")
-        if message_type == "response":
-            self._handle_response_update(message_dict)
-        elif message_type == "json_patch":
-            self._handle_state_update(message_dict)
-        elif message_type == self._device.type.value:
-            self._handle_device_update(message_dict)
+        if isinstance(frame, ResponseFrame):
+            self._handle_response_update(frame)
+        elif isinstance(frame, JsonPatchFrame):
+            self._handle_state_update(frame)
+        elif (
+            isinstance(frame, DeviceStateFrame)
+            and frame.type == self._device.type.value
+        ):
+            self._handle_device_update(frame)
         else:
-            self._LOGGER.error(f"Got unknown message of type: {message_type}")
+            self._LOGGER.error(f"Got unknown message of type: {frame.type}")
 
-    def _on_close(self, ws: websocket.WebSocket, close_code: int, close_message: str):
+    def _on_close(self, ws: "websocket.WebSocket", close_code: int, close_message: str):
+        # Reconnecting is handled by the loop in `connect` once run_forever returns
         self._LOGGER.debug(
             f"Socket closed. Code: {close_code}, message: {close_message}"
         )
-        self._auto_reconnect_if_needed()
 
-    def _handle_response_update(self, received_message: dict) -> None:
-        message_id = received_message.get("message_id")
-        status_code = received_message.get("status")
-        self._LOGGER.debug(f"Received response update: {received_message}")
+    def _handle_response_update(self, frame: ResponseFrame) -> None:
+        message_id = frame.message_id
+        status_code = frame.status
+        self._LOGGER.debug(f"Received response update: {frame.raw}")
+
+        if self._tracer:
+            self._tracer.response_received(
+                self._device.identifier, message_id, status_code
+            )
+
+        ack = self._pending_acks.get(message_id)
+        if ack:
+            try:
+                ack.set_result(status_code)
+            except InvalidStateError:
+                pass
 
         if message_id == "hello" and status_code == 200:
             self._LOGGER.debug("Auto responding to `hello` response with `subscribe`")
@@ -194,48 +391,74 @@ class HomeWizardClimateWebSocket:
         elif status_code == 401:
             self._api.login()
 
-    def _handle_device_update(self, received_message: dict) -> None:
-        if self._socket_status == SocketStatus.INITIALIZING:
-            self._socket_status = SocketStatus.INITIALIZED
+    def _handle_device_update(self, frame: DeviceStateFrame) -> None:
+        with self._status_lock:
+            just_initialized = self._socket_status == SocketStatus.INITIALIZING
+            if just_initialized:
+                self._socket_status = SocketStatus.INITIALIZED
+
+        if just_initialized:
             self._LOGGER.debug("Socket initialized.")
             if self._on_initialized:
                 self._on_initialized(self._device)
 
-        self._LOGGER.debug(f"Received full device update: {received_message}")
-        self._update_last_state(
-            HomeWizardClimateDeviceState.from_dict(received_message.get("state"))
-        )
-
-    def _handle_state_update(self, received_message: dict) -> None:
-        if received_message.get("patch"):
-            kw = {}
-            for patch in received_message.get("patch"):
-                if patch.get("op", "") == "replace":
-                    path_split = patch.get("path", "").strip("/").split("/")
-                    if len(path_split) == 2 and path_split[0] == "state":
-                        kw.update({path_split[1]: patch.get("value")})
-
-            if kw:
-                self._update_last_state(replace(self._last_state, **kw))
+        self._LOGGER.debug(f"Received full device update: {frame.state}")
+        self._log_ignored_fields(frame.unknown_fields, frame.invalid_fields)
+        self._update_last_state(frame.state)
+
+    def _handle_state_update(self, frame: JsonPatchFrame) -> None:
+        self._log_ignored_fields(frame.unknown_fields, frame.invalid_fields)
+        if frame.changes:
+            self._update_last_state(replace(self._last_state, **frame.changes))
+
+    def _log_ignored_fields(self, unknown_fields: tuple, invalid_fields: tuple):
+        if unknown_fields:
+            self._LOGGER.debug(f"Ignoring unknown state fields: {unknown_fields}")
+        if invalid_fields:
+            self._LOGGER.warning(
+                f"Ignoring state fields with an invalid value: {invalid_fields}"
+            )
 
     def _update_last_state(self, new_last_state) -> None:
-        diff = diff_states(self._last_state, new_last_state)
+        # Only called from the connection thread, so there is a single writer
+        previous_state = self._last_state
+        diff = diff_states(previous_state, new_last_state)
         self._LOGGER.debug(f"Received state update, diff: {diff}")
         self._last_state = new_last_state
-        if self._on_state_change:
-            self._on_state_change(self._last_state, diff)
+        if self._tracer:
+            self._tracer.state_received(
+                self._device.identifier, previous_state, new_last_state
+            )
+        on_state_change = self._on_state_change
+        if on_state_change:
+            on_state_change(new_last_state, diff)
+        # Listeners are replaced copy-on-write, iterating the tuple needs no lock
+        for listener in self._state_listeners:
+            try:
+                listener(new_last_state, diff)
+            except Exception:
+                # One failing consumer must not starve the others
+                self._LOGGER.exception("State listener failed")
 
     def _auto_reconnect_if_needed(self, command: str = None):
-        self._socket_status = SocketStatus.NOT_INITIALIZED
-        if not self._disconnect_requested:
-            self._LOGGER.debug(
-                f"Automatically reconnecting on unwanted closed socket. {command}"
-            )
-            self.connect_in_thread()
+        with self._status_lock:
+            if self._disconnect_requested:
+                self._LOGGER.debug(
+                    "Disconnect was explicitly requested, not attempting to reconnect"
+                )
+                return
+
+            # A running connection loop reconnects by itself once the broken
+            # socket is closed, we only need to start one if there is none.
+            needs_loop = not self._connection_loop_running
+
+        self._LOGGER.debug(
+            f"Automatically reconnecting on unwanted closed socket. {command}"
+        )
+        if needs_loop:
+            self._start_connection_thread()
         else:
-            self._LOGGER.debug(
-                "Disconnect was explicitly requested, not attempting to reconnect"
-            )
+            self._socket_app.close()
 
     def _safe_payload_log(self, payload: str):
         if '"token": ' in payload:
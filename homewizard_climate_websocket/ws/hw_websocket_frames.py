@@ -0,0 +1,131 @@
+import json
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from homewizard_climate_websocket.model.climate_device import (
+    HomeWizardClimateDeviceType,
+)
+from homewizard_climate_websocket.model.climate_device_state import (
+    HomeWizardClimateDeviceState,
+    is_valid_state_value,
+    state_field_names,
+)
+
+_STATE_PATH_PREFIX = "/state/"
+_STATE_FIELDS = frozenset(state_field_names())
+
+
+@dataclass(frozen=True)
+class ResponseFrame:
+    device: Optional[str]
+    message_id: Optional[str]
+    status: Optional[int]
+    raw: dict
+
+
+@dataclass(frozen=True)
+class JsonPatchFrame:
+    device: Optional[str]
+    # Known state fields replaced by the patch, in order
+    changes: dict
+    # Replaced state fields this version of the library does not know about
+    unknown_fields: tuple
+    # Known state fields dropped because their value has the wrong type
+    invalid_fields: tuple = ()
+
+
+@dataclass(frozen=True)
+class DeviceStateFrame:
+    device: Optional[str]
+    type: str
+    state: HomeWizardClimateDeviceState
+    unknown_fields: tuple
+    # Known state fields reset to their default because of a wrong type
+    invalid_fields: tuple = ()
+
+
+@dataclass(frozen=True)
+class UnknownFrame:
+    device: Optional[str]
+    type: str
+
+
+Frame = Union[ResponseFrame, JsonPatchFrame, DeviceStateFrame, UnknownFrame]
+
+
+def _decode_response(message: dict) -> ResponseFrame:
+    return ResponseFrame(
+        message.get("device"), message.get("message_id"), message.get("status"), message
+    )
+
+
+def _decode_json_patch(message: dict) -> JsonPatchFrame:
+    changes = {}
+    unknown_fields = []
+    invalid_fields = []
+    patches = message.get("patch")
+    for patch in patches if isinstance(patches, list) else ():
+        if not isinstance(patch, dict):
+            continue
+        path = patch.get("path")
+        if (
+            patch.get("op") != "replace"
+            or not isinstance(path, str)
+            or not path.startswith(_STATE_PATH_PREFIX)
+        ):
+            continue
+        field = path[len(_STATE_PATH_PREFIX) :].rstrip("/")
+        value = patch.get("value")
+        if field not in _STATE_FIELDS:
+            if "/" not in field:
+                unknown_fields.append(field)
+        elif is_valid_state_value(field, value):
+            changes[field] = list(value) if isinstance(value, list) else value
+        else:
+            invalid_fields.append(field)
+
+    return JsonPatchFrame(
+        message.get("device"), changes, tuple(unknown_fields), tuple(invalid_fields)
+    )
+
+
+def _decode_device_state(message: dict) -> DeviceStateFrame:
+    state = message.get("state")
+    if not isinstance(state, dict):
+        state = {}
+    return DeviceStateFrame(
+        message.get("device"),
+        message["type"],
+        HomeWizardClimateDeviceState.from_dict(state),
+        tuple(k for k in state if k not in _STATE_FIELDS),
+        tuple(
+            k
+            for k, v in state.items()
+            if k in _STATE_FIELDS and not is_valid_state_value(k, v)
+        ),
+    )
+
+
+_DECODERS: dict[str, Callable[[dict], Frame]] = {
+    "response": _decode_response,
+    "json_patch": _decode_json_patch,
+    **{t.value: _decode_device_state for t in HomeWizardClimateDeviceType},
+}
+
+
+def decode_frame(message: str) -> Frame:
+    """Decodes a websocket message into a typed frame, dispatching on its
+    `type`. Missing state fields get their default value, unknown ones are
+    reported in `unknown_fields` and ones with a value of the wrong type in
+    `invalid_fields` instead of failing the decode."""
+    message_dict = json.loads(message)
+    if not isinstance(message_dict, dict):
+        return UnknownFrame(None, "")
+    message_type = message_dict.get("type", "")
+    if not isinstance(message_type, str):
+        return UnknownFrame(message_dict.get("device"), "")
+    decoder = _DECODERS.get(message_type)
+    if decoder is None:
+        return UnknownFrame(message_dict.get("device"), message_type)
+    return decoder(message_dict)
@@ -54,6 +54,7 @@ class HomeWizardClimateWSPayloads:
         return json.dumps(
             {
                 "device": self._device.identifier,
+                "message_id": "set_heater",
                 "type": "json_patch",
                 "patch": [{"op": "replace", "path": "/state/heater", "value": True}],
             }
@@ -63,6 +64,7 @@ class HomeWizardClimateWSPayloads:
         return json.dumps(
             {
                 "device": self._device.identifier,
+                "message_id": "set_cooler",
                 "type": "json_patch",
                 "patch": [{"op": "replace", "path": "/state/heater", "value": False}],
             }
@@ -72,6 +74,7 @@ class HomeWizardClimateWSPayloads:
         return json.dumps(
             {
                 "device": self._device.identifier,
+                "message_id": "set_target_temperature",
                 "type": "json_patch",
                 "patch": [
                     {
@@ -87,6 +90,7 @@ class HomeWizardClimateWSPayloads:
         return json.dumps(
             {
                 "device": self._device.identifier,
+                "message_id": "set_fan_speed",
                 "type": "json_patch",
                 "patch": [
                     {"op": "replace", "path": "/state/fan_speed", "value": speed}
@@ -98,6 +102,7 @@ class HomeWizardClimateWSPayloads:
         return json.dumps(
             {
                 "device": self._device.identifier,
+                "message_id": "turn_on_oscillate",
                 "type": "json_patch",
                 "patch": [{"op": "replace", "path": "/state/oscillate", "value": True}],
             }
@@ -107,6 +112,7 @@ class HomeWizardClimateWSPayloads:
         return json.dumps(
             {
                 "device": self._device.identifier,
+                "message_id": "turn_off_oscillate",
                 "type": "json_patch",
                 "patch": [
                     {"op": "replace", "path": "/state/oscillate", "value": False}
@@ -114,6 +120,19 @@ class HomeWizardClimateWSPayloads:
             }
         )
 
+    def patch_state(self, changes: dict, message_id: str) -> str:
+        return json.dumps(
+            {
+                "device": self._device.identifier,
+                "message_id": message_id,
+                "type": "json_patch",
+                "patch": [
+                    {"op": "replace", "path": f"/state/{field}", "value": value}
+                    for field, value in changes.items()
+                ],
+            }
+        )
+
 
 class HomeWizardClimateStatePath(Enum):
     CURRENT_TEMP = "/state/current_temperature"
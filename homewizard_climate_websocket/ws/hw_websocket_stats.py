@@ -0,0 +1,113 @@
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+# RFC 7692: every compressed message ends with an empty deflate block which is
+# stripped before sending
+_DEFLATE_TAIL = b"\x00\x00\xff\xff"
+
+
+@dataclass(frozen=True)
+class HomeWizardClimateTrafficStats:
+    messages_in: int = 0
+    messages_out: int = 0
+    # UTF-8 payload bytes, as handed to / received from the websocket
+    payload_bytes_in: int = 0
+    payload_bytes_out: int = 0
+    # Payload plus websocket frame headers (and masking keys for sent frames)
+    wire_bytes_in: int = 0
+    wire_bytes_out: int = 0
+    # Wire bytes permessage-deflate (with context takeover) would have needed,
+    # only counted when compression estimation is enabled
+    deflate_wire_bytes_in: Optional[int] = None
+    deflate_wire_bytes_out: Optional[int] = None
+
+
+def _frame_header_size(payload_length: int, masked: bool) -> int:
+    size = 2
+    if payload_length >= 65536:
+        size += 8
+    elif payload_length >= 126:
+        size += 2
+    return size + 4 if masked else size
+
+
+class _DeflateEstimator:
+    """Compresses messages like permessage-deflate with context takeover, only
+    to measure the resulting size."""
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+
+    def compressed_size(self, payload: bytes) -> int:
+        compressed = self._compressor.compress(payload) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+        if compressed.endswith(_DEFLATE_TAIL):
+            return len(compressed) - len(_DEFLATE_TAIL)
+        return len(compressed)
+
+
+class TrafficCounter:
+    """Thread safe byte accounting for one websocket connection."""
+
+    def __init__(self, estimate_compression: bool = False):
+        self._lock = threading.Lock()
+        self._estimate_compression = estimate_compression
+        self._estimators = (
+            (_DeflateEstimator(), _DeflateEstimator()) if estimate_compression else None
+        )
+        self._counters = self._empty_counters()
+
+    @property
+    def stats(self) -> HomeWizardClimateTrafficStats:
+        with self._lock:
+            return HomeWizardClimateTrafficStats(**self._counters)
+
+    def record_in(self, message: str) -> None:
+        # Frames from the server are not masked
+        self._record("in", message.encode(), masked=False)
+
+    def record_out(self, message: str) -> None:
+        self._record("out", message.encode(), masked=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters = self._empty_counters()
+
+    def connection_opened(self) -> None:
+        # A new connection starts with empty compression contexts
+        with self._lock:
+            if self._estimators:
+                self._estimators = (_DeflateEstimator(), _DeflateEstimator())
+
+    def _empty_counters(self) -> dict:
+        counters = {
+            "messages_in": 0,
+            "messages_out": 0,
+            "payload_bytes_in": 0,
+            "payload_bytes_out": 0,
+            "wire_bytes_in": 0,
+            "wire_bytes_out": 0,
+        }
+        if self._estimate_compression:
+            counters["deflate_wire_bytes_in"] = 0
+            counters["deflate_wire_bytes_out"] = 0
+        return counters
+
+    def _record(self, direction: str, payload: bytes, masked: bool) -> None:
+        length = len(payload)
+        with self._lock:
+            counters = self._counters
+            counters[f"messages_{direction}"] += 1
+            counters[f"payload_bytes_{direction}"] += length
+            counters[f"wire_bytes_{direction}"] += length + _frame_header_size(
+                length, masked
+            )
+            if self._estimators:
+                estimator = self._estimators[0 if direction == "in" else 1]
+                compressed = estimator.compressed_size(payload)
+                counters[
+                    f"deflate_wire_bytes_{direction}"
+                ] += compressed + _frame_header_size(compressed, masked)
@@ -0,0 +1,234 @@
+import bisect
+import json
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Optional
+
+from homewizard_climate_websocket.model.climate_device_state import (
+    HomeWizardClimateDeviceState,
+)
+
+# Upper bounds of the histogram buckets in seconds, the last bucket is unbounded
+DEFAULT_BUCKETS = (
+    0.001,
+    0.002,
+    0.005,
+    0.01,
+    0.02,
+    0.05,
+    0.1,
+    0.2,
+    0.5,
+    1.0,
+    2.0,
+    5.0,
+    10.0,
+    30.0,
+)
+
+# Stages recorded per command, from the command method being called (build),
+# the payload being handed to the socket (send), the server's response frame
+# (ack) and the first state update containing the requested values (echo)
+STAGE_BUILD_TO_SEND = "build_to_send"
+STAGE_SEND_TO_ACK = "send_to_ack"
+STAGE_SEND_TO_ECHO = "send_to_echo"
+STAGE_TOTAL = "build_to_echo"
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Upper bound of the bucket holding the `p`th percentile (0-100)."""
+        if not self.count:
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def copy(self) -> "LatencyHistogram":
+        histogram = LatencyHistogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.count = self.count
+        histogram.total = self.total
+        histogram.min = self.min
+        histogram.max = self.max
+        return histogram
+
+    def to_dict(self) -> dict:
+        return {
+            "buckets": list(self.buckets),
+            "counts": list(self.counts),
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+@dataclass
+class CommandTrace:
+    device: str
+    command: str
+    built_at: float
+    sent_at: Optional[float] = None
+    acked_at: Optional[float] = None
+    message_id: Optional[str] = None
+    expected: dict = field(default_factory=dict)
+
+
+class HomeWizardClimateCommandTracer:
+    """Opt-in latency tracing of commands, from the call to the state echo.
+
+    Pass one instance to any number of `HomeWizardClimateWebSocket`s. Latencies
+    are aggregated in histograms per (command, device, stage), see `STAGE_*`.
+    Commands not echoed within `timeout` seconds are dropped and counted in
+    `timeouts()`. Acknowledged commands requesting values the device already
+    had are dropped without recording an echo.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 60.0,
+        max_pending_per_device: int = 100,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self._timeout = timeout
+        self._max_pending = max_pending_per_device
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending: dict[str, list[CommandTrace]] = {}
+        self._histograms: dict[tuple[str, str, str], LatencyHistogram] = {}
+        self._timeouts: dict[tuple[str, str], int] = {}
+
+    def command_built(self, device: str, command: str) -> CommandTrace:
+        return CommandTrace(device, command, self._clock())
+
+    def command_sent(self, trace: CommandTrace, payload: str) -> None:
+        trace.sent_at = self._clock()
+        message = json.loads(payload)
+        trace.message_id = message.get("message_id")
+        for patch in message.get("patch", ()):
+            if patch.get("op") == "replace" and patch["path"].startswith("/state/"):
+                trace.expected[patch["path"][len("/state/") :]] = patch.get("value")
+
+        with self._lock:
+            self._record(trace, STAGE_BUILD_TO_SEND, trace.built_at, trace.sent_at)
+            pending = self._pending.setdefault(trace.device, [])
+            self._expire(pending, trace.sent_at)
+            pending.append(trace)
+            if len(pending) > self._max_pending:
+                self._count_timeout(pending.pop(0))
+
+    def response_received(
+        self, device: str, message_id: Optional[str], status: Optional[int]
+    ) -> None:
+        now = self._clock()
+        with self._lock:
+            for trace in self._pending.get(device, ()):
+                if trace.acked_at is None and trace.message_id == message_id:
+                    trace.acked_at = now
+                    self._record(trace, STAGE_SEND_TO_ACK, trace.sent_at, now)
+                    return
+
+    def state_received(
+        self,
+        device: str,
+        previous_state: HomeWizardClimateDeviceState,
+        state: HomeWizardClimateDeviceState,
+    ) -> None:
+        """A command is echoed by the first update that changes at least one of
+        its requested fields and holds all of its requested values."""
+        now = self._clock()
+        with self._lock:
+            pending = self._pending.get(device)
+            if not pending:
+                return
+            self._expire(pending, now)
+
+            remaining = []
+            for trace in pending:
+                matches = trace.expected and all(
+                    getattr(state, k, None) == v for k, v in trace.expected.items()
+                )
+                if not matches:
+                    remaining.append(trace)
+                elif any(
+                    getattr(previous_state, k, None) != v
+                    for k, v in trace.expected.items()
+                ):
+                    self._record(trace, STAGE_SEND_TO_ECHO, trace.sent_at, now)
+                    self._record(trace, STAGE_TOTAL, trace.built_at, now)
+                elif trace.acked_at is None:
+                    # The echo of a real change may still be on its way
+                    remaining.append(trace)
+            self._pending[device] = remaining
+
+    def histograms(self) -> dict[tuple[str, str, str], LatencyHistogram]:
+        """Copies of the histograms keyed by (command, device, stage)."""
+        with self._lock:
+            return {key: h.copy() for key, h in self._histograms.items()}
+
+    def timeouts(self) -> dict[tuple[str, str], int]:
+        """Number of commands per (command, device) that were never echoed."""
+        self._expire_all()
+        with self._lock:
+            return dict(self._timeouts)
+
+    def export(self) -> list[dict]:
+        """Histograms as JSON serializable records."""
+        self._expire_all()
+        return [
+            {"command": command, "device": device, "stage": stage, **h.to_dict()}
+            for (command, device, stage), h in self.histograms().items()
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._pending.clear()
+            self._histograms.clear()
+            self._timeouts.clear()
+
+    def _record(self, trace: CommandTrace, stage: str, start: float, end: float):
+        key = (trace.command, trace.device, stage)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = LatencyHistogram()
+        histogram.record(end - start)
+
+    def _expire_all(self) -> None:
+        now = self._clock()
+        with self._lock:
+            for pending in self._pending.values():
+                self._expire(pending, now)
+
+    def _expire(self, pending: list[CommandTrace], now: float) -> None:
+        while pending and now - pending[0].sent_at > self._timeout:
+            self._count_timeout(pending.pop(0))
+
+    def _count_timeout(self, trace: CommandTrace) -> None:
+        key = (trace.command, trace.device)
+        self._timeouts[key] = self._timeouts.get(key, 0) + 1
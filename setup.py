@@ -38,12 +38,12 @@ dev_requirements = [
 ]
 
 requirements = [
-    "dataclasses-json >= 0.5.7",
     "requests >= 2.28.0",
     "websocket-client >= 1.1.0",
 ]
 
 extra_requirements = {
+    "mqtt": ["paho-mqtt>=1.6.0"],
     "setup": setup_requirements,
     "test": test_requirements,
     "dev": dev_requirements,
@@ -68,9 +68,9 @@ setup(
     ],
     description="API/Websocket to control Homewizard Climate devices",
     entry_points={
-        # "console_scripts": [
-        #     "my_example=homewizard_climate_websocket.bin.my_example:main"
-        # ],
+        "console_scripts": [
+            "homewizard-climate=homewizard_climate_websocket.main:main"
+        ],
     },
     install_requires=requirements,
     license="MIT license",
@@ -22,6 +22,10 @@ from typing import Dict
 
 import pytest
 
+from homewizard_climate_websocket.api.api import HomeWizardClimateApi
+from homewizard_climate_websocket.model.climate_device import HomeWizardClimateDevice
+from homewizard_climate_websocket.ws.hw_websocket import HomeWizardClimateWebSocket
+
 
 @pytest.fixture
 def data_dir() -> Path:
@@ -35,3 +39,20 @@ def data_dir() -> Path:
 def loaded_example_values(data_dir) -> Dict[str, int]:
     with open(data_dir / "example_values.json", "r") as read_in:
         return json.load(read_in)
+
+
+# Websockets are only constructed, nothing connects until a test calls `connect`
+@pytest.fixture
+def make_websocket():
+    apis = {}
+
+    def make(
+        identifier: str = "dev0", username: str = "user", **kwargs
+    ) -> HomeWizardClimateWebSocket:
+        api = apis.setdefault(username, HomeWizardClimateApi(username, "password"))
+        device = HomeWizardClimateDevice.from_dict(
+            {"identifier": identifier, "type": "heaterfan"}
+        )
+        return HomeWizardClimateWebSocket(api, device, **kwargs)
+
+    return make
@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from homewizard_climate_websocket.fleet.bulk_commands import (
+    HomeWizardClimateBulkCommander,
+    RateLimiter,
+)
+
+
+def _response(message_id: str, status: int = 200) -> str:
+    return json.dumps(
+        {"type": "response", "device": "", "message_id": message_id, "status": status}
+    )
+
+
+def _acknowledging(ws):
+    """Makes the websocket answer every patch like the server would."""
+
+    def send(payload):
+        ws._on_message(None, _response(json.loads(payload)["message_id"]))
+
+    ws._socket_app.send = send
+    return ws
+
+
+def test_rate_limiter_spaces_acquisitions_after_the_burst():
+    limiter = RateLimiter(rate=50, burst=2)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+
+    # Two tokens up front, the other four at 50 per second
+    assert time.monotonic() - start >= 4 / 50 * 0.9
+
+
+def test_rate_limiter_rejects_invalid_settings():
+    with pytest.raises(ValueError):
+        RateLimiter(rate=0)
+    with pytest.raises(ValueError):
+        RateLimiter(rate=1, burst=0)
+    with pytest.raises(ValueError):
+        HomeWizardClimateBulkCommander([], rate_limit_per_second=-1)
+
+
+def test_concurrency_is_capped(make_websocket):
+    lock = threading.Lock()
+    in_flight = []
+    peaks = []
+
+    def patch_state(changes):
+        with lock:
+            in_flight.append(1)
+            peaks.append(len(in_flight))
+        time.sleep(0.02)
+        with lock:
+            in_flight.pop()
+        ack = Future()
+        ack.set_result(200)
+        return ack
+
+    websockets = [make_websocket(f"dev{i}") for i in range(8)]
+    for ws in websockets:
+        ws.patch_state = patch_state
+    commander = HomeWizardClimateBulkCommander(
+        websockets, max_concurrency=3, rate_limit_per_second=1000, rate_limit_burst=8
+    )
+
+    results = commander.apply({"power_on": True})
+
+    assert [r.acknowledged for r in results] == [True] * 8
+    assert max(peaks) <= 3
+
+
+def test_acknowledged_and_timed_out_results(make_websocket):
+    acked = _acknowledging(make_websocket("dev0"))
+    silent = make_websocket("dev1")
+    silent._socket_app.send = lambda payload: None
+    commander = HomeWizardClimateBulkCommander([acked, silent], ack_timeout=0.1)
+
+    results = {r.identifier: r for r in commander.apply({"fan_speed": 2})}
+
+    assert results["dev0"].acknowledged and results["dev0"].status == 200
+    assert results["dev0"].response_time is not None
+    assert not results["dev1"].acknowledged and results["dev1"].error == "timeout"
+    # The timed out future is cancelled and no longer tracked
+    assert silent._pending_acks == {}
+
+
+def test_rate_limiters_are_per_account(make_websocket):
+    first = make_websocket("dev0", username="alice")
+    second = make_websocket("dev1", username="alice")
+    other = make_websocket("dev2", username="bob")
+    commander = HomeWizardClimateBulkCommander([first, second, other])
+
+    assert commander._rate_limiter(first) is commander._rate_limiter(second)
+    assert commander._rate_limiter(first) is not commander._rate_limiter(other)
+
+
+def test_unknown_fields_are_rejected_before_sending(make_websocket):
+    ws = make_websocket()
+    sent = []
+    ws._socket_app.send = sent.append
+    commander = HomeWizardClimateBulkCommander([ws])
+
+    with pytest.raises(ValueError):
+        commander.apply({"bogus": 1})
+    assert sent == []
+    assert commander._rate_limiters == {}
@@ -0,0 +1,42 @@
+from dataclasses import replace
+
+from homewizard_climate_websocket.fleet.fleet_state import HomeWizardClimateFleetState
+from homewizard_climate_websocket.model.climate_device_state import default_state
+
+
+def test_devices_can_be_added_and_removed_while_a_column_is_exported():
+    fleet = HomeWizardClimateFleetState()
+    fleet.update("dev0", replace(default_state(), current_temperature=20))
+
+    view = memoryview(fleet.column("current_temperature"))
+    fleet.update("dev1", replace(default_state(), current_temperature=25))
+    fleet.remove("dev0")
+    fleet.update("dev2", replace(default_state(), current_temperature=30))
+
+    assert view.tolist() == [20.0]
+    assert fleet.identifiers == ["dev1", "dev2"]
+    assert list(fleet.column("current_temperature")) == [25.0, 30.0]
+    assert fleet.where("current_temperature", ">", 26) == ["dev2"]
+
+
+def test_invalid_values_are_skipped_and_fractions_kept():
+    fleet = HomeWizardClimateFleetState()
+    fleet.update("dev0", replace(default_state(), target_temperature=21.5))
+    fleet.update(
+        "dev0", replace(default_state(), target_temperature="hot", power_on="yes")
+    )
+
+    assert list(fleet.column("target_temperature")) == [21.5]
+    assert list(fleet.column("power_on")) == [0]
+
+
+def test_attaching_twice_does_not_leak_a_listener(make_websocket):
+    fleet = HomeWizardClimateFleetState()
+    ws = make_websocket()
+    fleet.attach(ws)
+    fleet.attach(ws, "building_a")
+    fleet.detach(ws)
+
+    ws._update_last_state(replace(default_state(), fan_speed=2))
+
+    assert fleet.identifiers == []
@@ -0,0 +1,116 @@
+import json
+
+from homewizard_climate_websocket.ws.hw_websocket_frames import (
+    DeviceStateFrame,
+    JsonPatchFrame,
+    ResponseFrame,
+    UnknownFrame,
+    decode_frame,
+)
+
+
+def test_device_state_frame_tolerates_missing_and_unknown_fields():
+    frame = decode_frame(
+        json.dumps(
+            {
+                "type": "heaterfan",
+                "device": "dev0",
+                "state": {"power_on": True, "new_firmware_field": 1},
+            }
+        )
+    )
+
+    assert isinstance(frame, DeviceStateFrame)
+    assert frame.state.power_on is True
+    assert frame.state.mode == "normal"
+    assert frame.unknown_fields == ("new_firmware_field",)
+
+
+def test_json_patch_frame_keeps_only_known_state_fields():
+    frame = decode_frame(
+        json.dumps(
+            {
+                "type": "json_patch",
+                "patch": [
+                    {"op": "replace", "path": "/state/fan_speed", "value": 3},
+                    {"op": "replace", "path": "/state/new_field", "value": 1},
+                    {"op": "add", "path": "/state/timer", "value": 1},
+                ],
+            }
+        )
+    )
+
+    assert isinstance(frame, JsonPatchFrame)
+    assert frame.changes == {"fan_speed": 3}
+    assert frame.unknown_fields == ("new_field",)
+
+
+def test_response_and_unknown_frames():
+    response = decode_frame(
+        '{"type": "response", "message_id": "hello", "status": 200}'
+    )
+    assert isinstance(response, ResponseFrame) and response.status == 200
+    assert isinstance(decode_frame('{"type": "something_new"}'), UnknownFrame)
+
+
+def test_values_of_the_wrong_type_are_dropped():
+    patch = decode_frame(
+        json.dumps(
+            {
+                "type": "json_patch",
+                "patch": [
+                    {
+                        "op": "replace",
+                        "path": "/state/target_temperature",
+                        "value": "hot",
+                    },
+                    {"op": "replace", "path": "/state/power_on", "value": 1},
+                    {"op": "replace", "path": "/state/fan_speed", "value": None},
+                    {"op": "replace", "path": "/state/mode", "value": "silent"},
+                ],
+            }
+        )
+    )
+    assert patch.changes == {"mode": "silent"}
+    assert patch.invalid_fields == ("target_temperature", "power_on", "fan_speed")
+
+    full = decode_frame(
+        json.dumps(
+            {
+                "type": "heaterfan",
+                "state": {"target_temperature": "hot", "mode": None, "error": [1]},
+            }
+        )
+    )
+    assert full.state.target_temperature == 0
+    assert full.state.mode == "normal"
+    assert full.state.error == []
+    assert set(full.invalid_fields) == {"target_temperature", "mode", "error"}
+
+
+def test_malformed_messages_do_not_raise():
+    assert isinstance(decode_frame("[1, 2]"), UnknownFrame)
+    assert isinstance(decode_frame('{"type": ["json_patch"]}'), UnknownFrame)
+
+    patch = decode_frame(
+        json.dumps(
+            {
+                "type": "json_patch",
+                "patch": ["x", {"op": "replace", "path": 3, "value": 1}],
+            }
+        )
+    )
+    assert patch.changes == {}
+    assert decode_frame('{"type": "json_patch", "patch": {"a": 1}}').changes == {}
+    assert decode_frame('{"type": "heaterfan", "state": [1]}').state.mode == "normal"
+
+
+def test_states_do_not_share_list_values():
+    first = decode_frame('{"type": "heaterfan", "state": {}}').state
+    second = decode_frame('{"type": "heaterfan", "state": {}}').state
+
+    first.error.append("E1")
+    first.to_dict()["ext_mode"].append("x")
+
+    assert second.error == []
+    assert second.ext_mode == [] and first.ext_mode == []
@@ -0,0 +1,100 @@
+import threading
+import time
+
+from homewizard_climate_websocket.ws.hw_websocket import SocketStatus
+
+
+def test_disconnect_before_socket_exists_prevents_connecting(make_websocket):
+    ws = make_websocket()
+    runs = []
+    ws._socket_app.run_forever = lambda: runs.append(1)
+
+    # The connection thread starting after `disconnect` must not connect
+    ws._clear_disconnect_request()
+    ws.disconnect()
+    ws._connect()
+
+    assert runs == []
+    assert ws.initialized == SocketStatus.NOT_INITIALIZED
+
+
+def test_disconnect_while_connecting_closes_opened_socket(make_websocket):
+    ws = make_websocket()
+    closed = []
+    ws._socket_app.close = lambda: closed.append(1)
+    sent = []
+    ws._socket_app.send = sent.append
+
+    def run_forever():
+        ws._disconnect_requested = True
+        ws._on_open(None)
+
+    ws._socket_app.run_forever = run_forever
+    ws.connect()
+
+    assert closed == [1]
+    assert sent == []
+
+
+def test_concurrent_connect_triggers_run_a_single_loop(make_websocket):
+    ws = make_websocket()
+    lock = threading.Lock()
+    runs = []
+    active = []
+    max_active = []
+    released = threading.Event()
+
+    def run_forever():
+        with lock:
+            runs.append(1)
+            active.append(1)
+            max_active.append(len(active))
+        released.wait(5)
+        with lock:
+            active.pop()
+
+    ws._socket_app.run_forever = run_forever
+    # Only the final disconnect unblocks the fake connection
+    ws._socket_app.close = lambda: ws._disconnect_requested and released.set()
+
+    start = threading.Barrier(8)
+
+    def trigger(i):
+        start.wait()
+        if i % 2:
+            ws.connect_in_thread()
+        else:
+            ws._auto_reconnect_if_needed()
+
+    triggers = [threading.Thread(target=trigger, args=(i,)) for i in range(8)]
+    for thread in triggers:
+        thread.start()
+    for thread in triggers:
+        thread.join()
+    # Give connection threads started by the triggers time to race
+    time.sleep(0.2)
+
+    ws.disconnect()
+    deadline = time.monotonic() + 5
+    while ws._connection_loop_running and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert runs == [1]
+    assert max(max_active) == 1
+    assert not ws._connection_loop_running
+
+
+def test_pending_patches_fail_when_the_connection_closes(make_websocket):
+    ws = make_websocket()
+    ws._socket_app.send = lambda payload: None
+    acks = []
+
+    def run_forever():
+        acks.extend(ws.patch_state({"fan_speed": speed}) for speed in range(5))
+        ws._disconnect_requested = True
+
+    ws._socket_app.run_forever = run_forever
+    ws.connect()
+
+    assert all(isinstance(ack.exception(0), Exception) for ack in acks)
+    assert ws._pending_acks == {}
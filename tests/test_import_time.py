@@ -0,0 +1,17 @@
+import subprocess
+import sys
+
+# Heavy dependencies which must only be imported when actually used
+LAZY_MODULES = ["requests", "websocket", "dataclasses_json", "marshmallow", "ssl"]
+
+
+def test_websocket_module_does_not_import_heavy_dependencies():
+    code = (
+        "import sys\n"
+        "import homewizard_climate_websocket.ws.hw_websocket\n"
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
@@ -0,0 +1,151 @@
+import io
+import json
+import os
+import socket
+import time
+
+import pytest
+
+from homewizard_climate_websocket.api.api import HomeWizardClimateApi
+from homewizard_climate_websocket.main import (
+    EventWriter,
+    Gateway,
+    _command_socket_server,
+)
+from homewizard_climate_websocket.model.climate_device import HomeWizardClimateDevice
+
+
+class FlushCountingOutput(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+        super().flush()
+
+
+class BrokenOutput:
+    def write(self, text):
+        raise BrokenPipeError()
+
+    def flush(self):
+        pass
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.events = []
+
+    def write(self, event: dict) -> None:
+        self.events.append(event)
+
+
+def test_writer_drops_oldest_events_when_full():
+    output = io.StringIO()
+    writer = EventWriter(output, buffer_size=3)
+    for i in range(5):
+        writer.write({"i": i})
+
+    writer.start()
+    writer.stop()
+
+    assert writer.dropped == 2
+    assert [json.loads(line)["i"] for line in output.getvalue().splitlines()] == [
+        2,
+        3,
+        4,
+    ]
+
+
+def test_writer_flushes_bursts_and_writes_everything_before_stopping():
+    output = FlushCountingOutput()
+    writer = EventWriter(output)
+    for i in range(150):
+        writer.write({"i": i})
+
+    writer.start()
+    writer.stop()
+
+    assert len(output.getvalue().splitlines()) == 150
+    # At most 100 events per write and flush
+    assert output.flushes == 2
+
+
+def test_writer_stop_returns_after_output_failure_and_late_events():
+    writer = EventWriter(BrokenOutput(), buffer_size=2)
+    writer.start()
+    writer.write({"i": 0})
+    time.sleep(0.2)
+    # The thread gave up, events now pile up and drop
+    for i in range(5):
+        writer.write({"i": i})
+
+    start = time.monotonic()
+    writer.stop()
+    # Late events after stop must not prevent the thread from ending either
+    writer.write({"late": True})
+
+    assert time.monotonic() - start < 1
+    assert writer.dropped >= 4
+
+
+def _gateway():
+    writer = RecordingWriter()
+    device = HomeWizardClimateDevice.from_dict(
+        {"identifier": "dev0", "type": "heaterfan"}
+    )
+    gateway = Gateway(HomeWizardClimateApi("user", "password"), [device], writer)
+    return gateway, gateway.websockets[0], writer
+
+
+def test_gateway_reports_invalid_command_lines():
+    gateway, ws, writer = _gateway()
+    sent = []
+    ws._socket_app.send = sent.append
+
+    gateway.handle_command_line("not json")
+    gateway.handle_command_line('{"device": "other", "changes": {}}')
+    gateway.handle_command_line('{"device": "dev0", "changes": {"bogus": 1}}')
+    gateway.handle_command_line("   ")
+
+    assert [event["event"] for event in writer.events] == ["error"] * 3
+    assert "bogus" in writer.events[2]["error"]
+    assert writer.events[2]["device"] == "dev0"
+    assert sent == []
+
+
+def test_gateway_writes_ack_events():
+    gateway, ws, writer = _gateway()
+
+    def send(payload):
+        message_id = json.loads(payload)["message_id"]
+        ws._on_message(
+            None,
+            json.dumps({"type": "response", "message_id": message_id, "status": 200}),
+        )
+
+    ws._socket_app.send = send
+    gateway.handle_command_line('{"device": "dev0", "changes": {"fan_speed": 2}}')
+
+    assert len(writer.events) == 1
+    ack = writer.events[0]
+    assert ack["event"] == "ack" and ack["status"] == 200 and ack["error"] is None
+    assert ack["changes"] == {"fan_speed": 2}
+
+
+def test_command_socket_only_replaces_stale_sockets(tmp_path):
+    gateway, _, _ = _gateway()
+    regular_file = tmp_path / "commands"
+    regular_file.write_text("keep me")
+    with pytest.raises(OSError):
+        _command_socket_server(gateway, str(regular_file))
+    assert regular_file.read_text() == "keep me"
+
+    stale = str(tmp_path / "stale.sock")
+    left_behind = socket.socket(socket.AF_UNIX)
+    left_behind.bind(stale)
+    left_behind.close()
+    server = _command_socket_server(gateway, stale)
+    server.server_close()
+    os.unlink(stale)
@@ -0,0 +1,60 @@
+import json
+
+from homewizard_climate_websocket.bridge.pubsub_bridge import (
+    HomeWizardClimatePubSubBridge,
+    LocalBroker,
+)
+
+
+def _patch(field, value):
+    return json.dumps(
+        {
+            "type": "json_patch",
+            "device": "dev0",
+            "patch": [{"op": "replace", "path": f"/state/{field}", "value": value}],
+        }
+    )
+
+
+def test_bridge_publishes_only_changed_fields_and_applies_commands(make_websocket):
+    broker = LocalBroker()
+    ws = make_websocket()
+    sent = []
+    ws._socket_app.send = sent.append
+    bridge = HomeWizardClimatePubSubBridge(broker)
+    bridge.add_websocket(ws)
+    bridge.flush()
+
+    published = []
+    broker.subscribe("homewizard_climate/+/state/+", lambda t, p: published.append(t))
+    published.clear()
+    for speed in (1, 2, 3):
+        ws._on_message(None, _patch("fan_speed", speed))
+    bridge.flush()
+
+    assert published == ["homewizard_climate/dev0/state/fan_speed"]
+    assert broker.retained["homewizard_climate/dev0/state/fan_speed"] == b"3"
+
+    bridge.start()
+    broker.publish("homewizard_climate/dev0/command/set_target_temperature", b"21")
+    bridge.stop()
+    assert json.loads(sent[-1])["patch"][0]["value"] == 21
+
+
+def test_restarted_bridge_applies_each_command_once(make_websocket):
+    broker = LocalBroker()
+    ws = make_websocket()
+    sent = []
+    ws._socket_app.send = sent.append
+    bridge = HomeWizardClimatePubSubBridge(broker)
+    bridge.add_websocket(ws)
+
+    bridge.start()
+    bridge.stop()
+    broker.publish("homewizard_climate/dev0/command/turn_on", b"")
+    assert sent == []
+
+    bridge.start()
+    broker.publish("homewizard_climate/dev0/command/turn_on", b"")
+    bridge.stop()
+    assert len(sent) == 1
@@ -0,0 +1,120 @@
+import heapq
+import json
+from datetime import datetime, time, timezone
+from time import monotonic, sleep
+
+import pytest
+
+from homewizard_climate_websocket.schedule.scheduler import (
+    HomeWizardClimateScheduleEntry,
+    HomeWizardClimateScheduler,
+)
+from homewizard_climate_websocket.ws.hw_websocket import SocketStatus
+
+
+def test_entry_is_caught_up_after_failed_send(make_websocket):
+    ws = make_websocket()
+    ws._socket_status = SocketStatus.INITIALIZED
+    # Not connected yet, so sending fails although the status is still INITIALIZED
+    ws._auto_reconnect_if_needed = lambda: None
+    entry = HomeWizardClimateScheduleEntry(time(7), {"target_temperature": 20})
+    scheduler = HomeWizardClimateScheduler()
+    scheduler.set_schedule(ws, [entry])
+
+    scheduler._fire(ws, entry)
+    assert scheduler._missed == {"dev0": entry}
+
+    sent = []
+    ws._socket_app.send = sent.append
+    ws._socket_status = SocketStatus.INITIALIZING
+    ws._on_message(
+        None, json.dumps({"type": "heaterfan", "device": "dev0", "state": {}})
+    )
+
+    assert scheduler._missed == {}
+    assert json.loads(sent[-1])["patch"][0]["value"] == 20
+
+
+class FakeClock:
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+def _wait_until(condition, timeout: float = 5) -> None:
+    deadline = monotonic() + timeout
+    while not condition() and monotonic() < deadline:
+        sleep(0.01)
+
+
+def test_unacknowledged_entry_is_kept_for_catch_up(make_websocket):
+    ws = make_websocket()
+    ws._socket_status = SocketStatus.INITIALIZED
+    # Sent, but the half-open connection never answers
+    ws._socket_app.send = lambda payload: None
+    entry = HomeWizardClimateScheduleEntry(time(7), {"target_temperature": 20})
+    scheduler = HomeWizardClimateScheduler(ack_timeout=0.05)
+    scheduler.set_schedule(ws, [entry])
+
+    scheduler._fire(ws, entry)
+    _wait_until(lambda: scheduler._missed)
+
+    assert scheduler._missed == {"dev0": entry}
+    assert ws._pending_acks == {}
+
+
+def test_timezone_aware_entries_are_rejected():
+    with pytest.raises(ValueError):
+        HomeWizardClimateScheduleEntry(time(7, tzinfo=timezone.utc), {})
+
+
+def test_entries_fire_in_time_order_and_are_rearmed(make_websocket):
+    clock = FakeClock(datetime(2024, 1, 1, 6))
+    scheduler = HomeWizardClimateScheduler(clock=clock)
+    first, second = make_websocket("dev0"), make_websocket("dev1")
+    at_7 = HomeWizardClimateScheduleEntry(time(7), {"power_on": True})
+    at_8 = HomeWizardClimateScheduleEntry(time(8), {"power_on": False})
+    at_730 = HomeWizardClimateScheduleEntry(time(7, 30), {"fan_speed": 2})
+    scheduler.set_schedule(first, [at_8, at_7])
+    scheduler.set_schedule(second, [at_730])
+
+    queue = list(scheduler._queue)
+    order = [heapq.heappop(queue)[4] for _ in range(len(queue))]
+    assert order == [at_7, at_730, at_8]
+
+    fired = []
+    scheduler._fire = lambda ws, entry: fired.append((ws.device.identifier, entry))
+    clock.now = datetime(2024, 1, 1, 7)
+    scheduler.start()
+    _wait_until(lambda: fired)
+    scheduler.stop()
+
+    assert fired == [("dev0", at_7)]
+    assert (datetime(2024, 1, 2, 7), at_7) in [
+        (item[0], item[4]) for item in scheduler._queue
+    ]
+
+
+def test_replaced_and_cleared_schedules_do_not_fire(make_websocket):
+    clock = FakeClock(datetime(2024, 1, 1, 6))
+    scheduler = HomeWizardClimateScheduler(clock=clock)
+    first, second = make_websocket("dev0"), make_websocket("dev1")
+    old = HomeWizardClimateScheduleEntry(time(7), {"power_on": True})
+    new = HomeWizardClimateScheduleEntry(time(7), {"power_on": False})
+    scheduler.set_schedule(first, [old])
+    scheduler.set_schedule(first, [new])
+    scheduler.set_schedule(second, [old])
+    scheduler.clear_schedule(second)
+
+    fired = []
+    scheduler._fire = lambda ws, entry: fired.append((ws.device.identifier, entry))
+    clock.now = datetime(2024, 1, 1, 7)
+    scheduler.start()
+    # Stale items are dropped, only the re-armed current entry stays queued
+    _wait_until(lambda: all(item[0] > clock.now for item in scheduler._queue))
+    scheduler.stop()
+
+    assert fired == [("dev0", new)]
+    assert [item[4] for item in scheduler._queue] == [new]
@@ -0,0 +1,85 @@
+import http.client
+import os
+import socket
+from dataclasses import replace
+
+import pytest
+
+from homewizard_climate_websocket.model.climate_device_state import default_state
+from homewizard_climate_websocket.server.state_server import (
+    HomeWizardClimateStateServer,
+    HomeWizardClimateStateStore,
+)
+
+
+def test_identical_states_keep_version_and_etag_is_content_based():
+    store = HomeWizardClimateStateStore()
+    store.update("dev0", default_state())
+    store.update("dev0", default_state())
+    version, _, etag = store.get("dev0")
+    assert version == 1
+
+    restarted = HomeWizardClimateStateStore()
+    restarted.update("dev0", default_state())
+    assert restarted.get("dev0")[2] == etag
+
+    store.update("dev0", replace(default_state(), fan_speed=2))
+    assert store.get("dev0")[0] == 2
+    assert store.get("dev0")[2] != etag
+
+
+def test_invalid_long_poll_wait_is_rejected():
+    store = HomeWizardClimateStateStore()
+    store.update("dev0", default_state())
+    etag = store.get("dev0")[2]
+    server = HomeWizardClimateStateServer(store, port=0)
+    server.start()
+    try:
+        connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+        for wait in ("nan", "inf", "-1", "soon"):
+            connection.request(
+                "GET",
+                f"/devices/dev0/state?wait={wait}",
+                headers={"If-None-Match": etag},
+            )
+            response = connection.getresponse()
+            response.read()
+            assert response.status == 400
+    finally:
+        server.stop()
+
+
+def test_adding_a_websocket_twice_does_not_leak_a_listener(make_websocket):
+    store = HomeWizardClimateStateStore()
+    ws = make_websocket()
+    store.add_websocket(ws)
+    store.add_websocket(ws)
+    store.remove_websocket(ws)
+
+    ws._update_last_state(replace(default_state(), fan_speed=2))
+
+    assert store.identifiers == []
+
+
+def test_unix_socket_path_only_replaces_sockets_and_stop_without_start(tmp_path):
+    regular_file = tmp_path / "states"
+    regular_file.write_text("keep me")
+    with pytest.raises(OSError):
+        HomeWizardClimateStateServer(
+            HomeWizardClimateStateStore(), unix_socket_path=str(regular_file)
+        )
+    assert regular_file.read_text() == "keep me"
+
+    path = str(tmp_path / "states.sock")
+    HomeWizardClimateStateServer(
+        HomeWizardClimateStateStore(), unix_socket_path=path
+    ).stop()
+    # A socket left behind by an earlier run is replaced
+    left_behind = socket.socket(socket.AF_UNIX)
+    left_behind.bind(path)
+    left_behind.close()
+    server = HomeWizardClimateStateServer(
+        HomeWizardClimateStateStore(), unix_socket_path=path
+    )
+    server.stop()
+    assert not os.path.exists(path)
@@ -0,0 +1,63 @@
+import json
+from dataclasses import replace
+
+import pytest
+
+from homewizard_climate_websocket.model.climate_device_state import default_state
+from homewizard_climate_websocket.ws.hw_websocket_tracing import (
+    STAGE_SEND_TO_ECHO,
+    HomeWizardClimateCommandTracer,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _send_fan_speed(tracer: HomeWizardClimateCommandTracer, speed: int) -> None:
+    trace = tracer.command_built("dev0", "set_fan_speed")
+    payload = {
+        "type": "json_patch",
+        "message_id": "set_fan_speed",
+        "patch": [{"op": "replace", "path": "/state/fan_speed", "value": speed}],
+    }
+    tracer.command_sent(trace, json.dumps(payload))
+
+
+def test_only_changed_fields_count_as_echo():
+    clock = FakeClock()
+    tracer = HomeWizardClimateCommandTracer(clock=clock)
+    state = default_state()
+
+    # The device is already at speed 0, an unrelated update is no echo
+    _send_fan_speed(tracer, 0)
+    tracer.response_received("dev0", "set_fan_speed", 200)
+    clock.now = 0.5
+    tracer.state_received("dev0", state, replace(state, power_on=True))
+    assert ("set_fan_speed", "dev0", STAGE_SEND_TO_ECHO) not in tracer.histograms()
+
+    _send_fan_speed(tracer, 2)
+    clock.now = 0.8
+    tracer.state_received("dev0", state, replace(state, fan_speed=2))
+    echo = tracer.histograms()[("set_fan_speed", "dev0", STAGE_SEND_TO_ECHO)]
+    assert echo.count == 1 and echo.total == pytest.approx(0.3)
+    assert tracer.timeouts() == {}
+
+
+def test_timeouts_are_reported_without_further_commands():
+    clock = FakeClock()
+    tracer = HomeWizardClimateCommandTracer(timeout=10, clock=clock)
+
+    _send_fan_speed(tracer, 2)
+    assert tracer.timeouts() == {}
+
+    clock.now = 11
+    assert tracer.timeouts() == {("set_fan_speed", "dev0"): 1}
+    # Expired commands can no longer be echoed
+    state = default_state()
+    tracer.state_received("dev0", state, replace(state, fan_speed=2))
+    assert ("set_fan_speed", "dev0", STAGE_SEND_TO_ECHO) not in tracer.histograms()
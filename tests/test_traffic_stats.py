@@ -0,0 +1,54 @@
+import pytest
+
+from homewizard_climate_websocket.ws.hw_websocket_stats import (
+    HomeWizardClimateTrafficStats,
+    TrafficCounter,
+    _frame_header_size,
+)
+
+
+@pytest.mark.parametrize(
+    "length, header",
+    [(0, 2), (125, 2), (126, 4), (65535, 4), (65536, 10)],
+)
+def test_frame_header_size_boundaries(length, header):
+    assert _frame_header_size(length, masked=False) == header
+    # Client frames carry a 4 byte masking key
+    assert _frame_header_size(length, masked=True) == header + 4
+
+
+def test_counters_per_direction_and_reset():
+    counter = TrafficCounter()
+    counter.record_in("a" * 200)
+    counter.record_out("é")
+
+    stats = counter.stats
+    assert stats.messages_in == 1 and stats.messages_out == 1
+    assert stats.payload_bytes_in == 200 and stats.wire_bytes_in == 204
+    # Payloads are counted in UTF-8 bytes
+    assert stats.payload_bytes_out == 2 and stats.wire_bytes_out == 8
+    assert stats.deflate_wire_bytes_in is None
+
+    counter.reset()
+    assert counter.stats == HomeWizardClimateTrafficStats()
+
+
+def test_deflate_context_restarts_with_each_connection():
+    message = '{"type": "json_patch", "patch": [{"path": "/state/fan_speed"}]}'
+    counter = TrafficCounter(estimate_compression=True)
+
+    def compressed_size() -> int:
+        before = counter.stats.deflate_wire_bytes_in
+        counter.record_in(message)
+        return counter.stats.deflate_wire_bytes_in - before
+
+    first = compressed_size()
+    # Context takeover makes a repeated message much cheaper
+    repeated = compressed_size()
+    assert repeated < first < len(message) + 2
+
+    counter.connection_opened()
+    assert compressed_size() == first
+
+    counter.reset()
+    assert counter.stats.deflate_wire_bytes_in == 0